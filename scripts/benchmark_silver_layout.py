@@ -0,0 +1,145 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.query.silver_query import SilverQuery
+
+MONTH_START = datetime(2024, 1, 1)
+
+# "All trips from zone 132 between 17:00 and 19:00 on a given day"
+SELECTIVE_FILTERS = [
+    ("PULocationID", "=", 132),
+    ("tpep_pickup_datetime", ">=", datetime(2024, 1, 15, 17)),
+    ("tpep_pickup_datetime", "<", datetime(2024, 1, 15, 19)),
+]
+SELECTIVE_COLUMNS = ["tpep_pickup_datetime", "PULocationID", "DOLocationID", "fare_amount"]
+
+
+def generate_trips(rows: int, seed: int = 42) -> pa.Table:
+    """Generate a month of synthetic trips with the silver column types
+
+    Args:
+        rows (int): number of trips
+        seed (int): random seed (default: 42)
+
+    Returns:
+        Table: synthetic trips in arrival (unsorted) order
+    """
+    rng = np.random.default_rng(seed)
+    pickup_offsets = rng.integers(0, 31 * 24 * 3600, rows)
+    pickup = np.datetime64(MONTH_START) + pickup_offsets.astype("timedelta64[s]")
+    return pa.table(
+        {
+            "tpep_pickup_datetime": pa.array(pickup.astype("datetime64[us]")),
+            "tpep_dropoff_datetime": pa.array((pickup + rng.integers(60, 3600, rows).astype("timedelta64[s]")).astype("datetime64[us]")),
+            "PULocationID": pa.array(rng.integers(1, 266, rows), pa.int16()),
+            "DOLocationID": pa.array(rng.integers(1, 266, rows), pa.int16()),
+            "passenger_count": pa.array(rng.integers(1, 5, rows), pa.int8()),
+            "trip_distance": pa.array(rng.gamma(2.0, 1.5, rows)),
+            "fare_amount": pa.array(rng.gamma(2.0, 8.0, rows).round(2)),
+            "payment_type": pa.array(rng.choice([1, 2], rows, p=[0.75, 0.25]), pa.int8()),
+        }
+    )
+
+
+def write_layout(table: pa.Table, root: str, sorted_layout: bool, row_group_size: int) -> None:
+    """Write trips partitioned by payment_type like the silver writer
+
+    Timestamps are encoded like the Spark writer of each layout: the previous layout as INT96
+    (Spark's default, written without min/max statistics), the sorted layout as INT64
+    microseconds (spark.sql.parquet.outputTimestampType=TIMESTAMP_MICROS).
+
+    Args:
+        table (Table): trips to write
+        root (str): output directory
+        sorted_layout (bool): cluster by PULocationID, sort by pickup time and write page indexes
+        row_group_size (int): rows per row group
+
+    Returns:
+        None: writes one parquet file per payment_type partition
+    """
+    for payment_type in sorted(table["payment_type"].unique().to_pylist()):
+        partition = table.filter(pc.equal(table["payment_type"], payment_type)).drop_columns(["payment_type"])
+        options: Dict[str, Any] = {"use_deprecated_int96_timestamps": True}
+        if sorted_layout:
+            partition = partition.sort_by([("PULocationID", "ascending"), ("tpep_pickup_datetime", "ascending")])
+            options = {
+                "write_page_index": True,
+                "sorting_columns": [pq.SortingColumn(partition.schema.get_field_index(name)) for name in ("PULocationID", "tpep_pickup_datetime")],
+            }
+        directory = os.path.join(root, f"payment_type={payment_type}")
+        os.makedirs(directory, exist_ok=True)
+        pq.write_table(partition, os.path.join(directory, "part-00000.parquet"), row_group_size=row_group_size, **options)
+
+
+def run_query(root: str, repeats: int) -> Dict[str, float]:
+    """Run the selective query against a layout and measure it
+
+    Args:
+        root (str): layout directory
+        repeats (int): number of timed runs, the median latency is reported
+
+    Returns:
+        dict: rows returned, row groups read, bytes read and median latency in ms
+    """
+    latencies = []
+    for _ in range(repeats):
+        query = SilverQuery(root)
+        started = time.perf_counter()
+        table = query.to_table(columns=SELECTIVE_COLUMNS, filters=SELECTIVE_FILTERS)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "rows": table.num_rows,
+        "row_groups_read": query.last_scan.row_groups_read,
+        "row_groups_total": query.last_scan.row_groups_total,
+        "bytes_read": query.last_scan.bytes_read,
+        "latency_ms": statistics.median(latencies),
+    }
+
+
+def benchmark(rows: int, row_group_size: int, repeats: int, output_dir: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Compare the selective query on the previous and the sorted silver layout
+
+    Args:
+        rows (int): number of synthetic trips
+        row_group_size (int): rows per row group for both layouts
+        repeats (int): number of timed runs per layout
+        output_dir (str): directory receiving both layouts
+
+    Returns:
+        tuple: (before, after) measurements from run_query
+    """
+    table = generate_trips(rows)
+    results = []
+    for name, sorted_layout in (("before", False), ("after", True)):
+        root = os.path.join(output_dir, name)
+        write_layout(table, root, sorted_layout, row_group_size)
+        results.append(run_query(root, repeats))
+    return results[0], results[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark selective reads on the silver layout")
+    parser.add_argument("--rows", type=int, default=3_000_000, help="Number of synthetic trips (default: 3000000).")
+    parser.add_argument("--row-group-size", type=int, default=100_000, help="Rows per row group (default: 100000).")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per layout (default: 5).")
+    parser.add_argument("--output-dir", help="Directory for the generated layouts (default: temporary directory).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        before, after = benchmark(args.rows, args.row_group_size, args.repeats, args.output_dir or tmpdirname)
+
+    print(f"{'layout':<8}{'rows':>8}{'row groups':>14}{'MB read':>10}{'latency ms':>12}")
+    for name, result in (("before", before), ("after", after)):
+        row_groups = f"{result['row_groups_read']}/{result['row_groups_total']}"
+        print(f"{name:<8}{result['rows']:>8}{row_groups:>14}{result['bytes_read'] / 1024**2:>10.2f}{result['latency_ms']:>12.1f}")
@@ -4,6 +4,10 @@ import shutil
 import subprocess
 import sys
 
+# Minimum versions for layers shadowing the SDK bundled with the Lambda runtime,
+# data_downloader needs ChecksumType=FULL_OBJECT (botocore 1.36+)
+LAYER_REQUIREMENTS = {"boto3": "boto3>=1.36.0"}
+
 
 def create_single_layer_package(package_name: str, python_version: str = "3.10", platform: str = "manylinux2014_x86_64") -> None:
     """Create a single package Lambda layer with specified dependencies
@@ -27,7 +31,7 @@ def create_single_layer_package(package_name: str, python_version: str = "3.10",
             "-m",
             "pip",
             "install",
-            package_name,
+            LAYER_REQUIREMENTS.get(package_name, package_name),
             f"--target={layer_dir}/python/lib/python{python_version}/site-packages",
             "--platform",
             platform,
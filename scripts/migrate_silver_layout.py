@@ -0,0 +1,109 @@
+import argparse
+from typing import List
+
+import boto3
+
+SILVER_PREFIX = "cleaned/"
+HASH_PREFIX = "_dedup/trip_hashes/"
+BRONZE_PREFIX = "nyc_taxi/"
+FINGERPRINT_PREFIX = "_fingerprints/"
+DELETE_BATCH_SIZE = 1000  # max keys per delete_objects call allowed by S3
+
+
+def find_legacy_keys(s3_client, silver_bucket: str) -> List[str]:
+    """List silver and trip hash files written before the source_month/source_rg layout
+
+    Args:
+        s3_client (S3.Client): S3 client
+        silver_bucket (str): silver bucket name
+
+    Returns:
+        list: keys of payment_type=N/part-* files and source_month=M/part-* hash files
+    """
+    legacy = []
+    for prefix in (SILVER_PREFIX, HASH_PREFIX):
+        for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=silver_bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                if "=" in key and "/source_rg=" not in key:
+                    legacy.append(key)
+    return legacy
+
+
+def delete_keys(s3_client, bucket: str, keys: List[str]) -> None:
+    """Delete keys in batches
+
+    Args:
+        s3_client (S3.Client): S3 client
+        bucket (str): bucket name
+        keys (list): keys to delete
+
+    Returns:
+        None: removes the objects
+    """
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        objects = [{"Key": key} for key in keys[start : start + DELETE_BATCH_SIZE]]
+        s3_client.delete_objects(Bucket=bucket, Delete={"Objects": objects})
+
+
+def reset_bronze_status(s3_client, bronze_bucket: str) -> int:
+    """Clear processing tags and row group fingerprints so every month is reprocessed
+
+    Args:
+        s3_client (S3.Client): S3 client
+        bronze_bucket (str): bronze bucket name
+
+    Returns:
+        int: number of bronze files reset
+    """
+    reset = 0
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bronze_bucket, Prefix=BRONZE_PREFIX):
+        for obj in page.get("Contents", []):
+            s3_client.delete_object_tagging(Bucket=bronze_bucket, Key=obj["Key"])
+            reset += 1
+
+    fingerprints = [
+        obj["Key"]
+        for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bronze_bucket, Prefix=FINGERPRINT_PREFIX)
+        for obj in page.get("Contents", [])
+    ]
+    delete_keys(s3_client, bronze_bucket, fingerprints)
+    return reset
+
+
+def migrate(silver_bucket: str, bronze_bucket: str, dry_run: bool = False) -> List[str]:
+    """Remove the pre source_rg silver layout and queue every bronze month for a rebuild
+
+    Spark cannot read cleaned/ while payment_type=N/ holds both part files and
+    source_month=M/ directories, and SilverQuery would return those trips twice. The legacy
+    files are deleted and all bronze files reset, so the next run with --full_listing true
+    rebuilds every month in the new layout.
+
+    Args:
+        silver_bucket (str): silver bucket name
+        bronze_bucket (str): bronze bucket name
+        dry_run (bool): only list the legacy files (default: False)
+
+    Returns:
+        list: legacy keys found (and deleted unless dry_run)
+    """
+    s3_client = boto3.client("s3")
+    legacy = find_legacy_keys(s3_client, silver_bucket)
+    print(f"{len(legacy)} legacy silver and trip hash files in s3://{silver_bucket}")
+    if dry_run:
+        return legacy
+
+    delete_keys(s3_client, silver_bucket, legacy)
+    reset = reset_bronze_status(s3_client, bronze_bucket)
+    print(f"Deleted {len(legacy)} legacy files, reset {reset} bronze files for reprocessing")
+    return legacy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate silver to the source_month/source_rg partition layout")
+    parser.add_argument("--silver-bucket", required=True, help="Silver bucket name.")
+    parser.add_argument("--bronze-bucket", required=True, help="Bronze bucket name.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the legacy files.")
+    args = parser.parse_args()
+
+    migrate(args.silver_bucket, args.bronze_bucket, args.dry_run)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+import boto3
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+SOURCE_MONTH_PATTERN = r"yellow_taxi_(\d{4}-\d{2})_"
+# Ids start with a letter so hive partition inference always reads source_rg as a string
+ROW_GROUP_ID_PREFIX = "rg"
+SOURCE_ROW_GROUP_PATTERN = rf"source_rg=({ROW_GROUP_ID_PREFIX}[0-9a-f]+)"
+FINGERPRINT_PREFIX = "_fingerprints/"
+STAGING_PREFIX = "_staging/"
+
+
+def parse_source_month(key: str) -> Optional[str]:
+    """Parse the year-month from a bronze file key
+
+    Args:
+        key (str): S3 key of the bronze file
+
+    Returns:
+        str: year-month such as 2024-01, None if the key does not follow the bronze naming
+    """
+    match = re.search(SOURCE_MONTH_PATTERN, key)
+    return match.group(1) if match else None
+
+
+def fingerprint_row_groups(bucket: str, key: str, filesystem: Optional[pafs.FileSystem] = None) -> List[Dict[str, Any]]:
+    """Fingerprint every row group of a bronze parquet file
+
+    The fingerprint id hashes the compressed bytes of all column chunks of the row group
+    together with its row count and column statistics, so it only changes with its content.
+
+    Args:
+        bucket (str): source S3 bucket containing raw files
+        key (str): S3 key of the parquet file
+        filesystem (FileSystem): filesystem holding the bucket (default: S3FileSystem)
+
+    Returns:
+        list: per row group dicts with index, id, num_rows and stats
+    """
+    filesystem = filesystem or pafs.S3FileSystem()
+    fingerprints = []
+    with filesystem.open_input_file(f"{bucket}/{key}") as source:
+        metadata = pq.read_metadata(source)
+        for index in range(metadata.num_row_groups):
+            row_group = metadata.row_group(index)
+            digest = hashlib.sha256()
+            stats = {}
+            for column_index in range(row_group.num_columns):
+                chunk = row_group.column(column_index)
+                start = chunk.dictionary_page_offset if chunk.has_dictionary_page else chunk.data_page_offset
+                digest.update(source.read_at(chunk.total_compressed_size, start))
+                if chunk.is_stats_set and chunk.statistics.has_min_max:
+                    stats[chunk.path_in_schema] = [str(chunk.statistics.min), str(chunk.statistics.max), chunk.statistics.null_count]
+            digest.update(json.dumps([row_group.num_rows, stats], sort_keys=True).encode("utf-8"))
+            row_group_id = f"{ROW_GROUP_ID_PREFIX}{digest.hexdigest()[:16]}"
+            fingerprints.append({"index": index, "id": row_group_id, "num_rows": row_group.num_rows, "stats": stats})
+    return fingerprints
+
+
+def load_fingerprints(bucket: str, source_month: str) -> List[Dict[str, Any]]:
+    """Load the row group fingerprints of the last processed version of a month
+
+    Args:
+        bucket (str): source S3 bucket containing raw files
+        source_month (str): year-month of the bronze file
+
+    Returns:
+        list: fingerprints from fingerprint_row_groups, empty if the month was never processed
+    """
+    s3 = boto3.client("s3")
+    try:
+        body = s3.get_object(Bucket=bucket, Key=f"{FINGERPRINT_PREFIX}yellow_taxi_{source_month}.json")["Body"].read()
+    except s3.exceptions.NoSuchKey:
+        return []
+    return json.loads(body)["row_groups"]
+
+
+def save_fingerprints(bucket: str, source_month: str, key: str, fingerprints: List[Dict[str, Any]]) -> None:
+    """Store the row group fingerprints of the processed version of a month
+
+    Args:
+        bucket (str): source S3 bucket containing raw files
+        source_month (str): year-month of the bronze file
+        key (str): S3 key of the processed bronze file
+        fingerprints (list): fingerprints from fingerprint_row_groups
+
+    Returns:
+        None: writes the fingerprint json next to the bronze data
+    """
+    s3 = boto3.client("s3")
+    body = json.dumps({"key": key, "row_groups": fingerprints})
+    s3.put_object(Bucket=bucket, Key=f"{FINGERPRINT_PREFIX}yellow_taxi_{source_month}.json", Body=body.encode("utf-8"))
+
+
+def plan_row_group_changes(bucket: str, keys: List[str], filesystem: Optional[pafs.FileSystem] = None) -> List[Dict[str, Any]]:
+    """Compare bronze files with the previous version of their month
+
+    Only the latest download of each month in the batch is planned; earlier downloads are
+    superseded by it. Row groups are matched on fingerprint id, so unchanged row groups are
+    recognized even if they moved within the file. Keys without a source month are skipped
+    with a warning so one stray object does not block the batch.
+
+    Args:
+        bucket (str): source S3 bucket containing raw files
+        keys (list): bronze file keys to process
+        filesystem (FileSystem): filesystem holding the bucket (default: S3FileSystem)
+
+    Returns:
+        list: per month dicts with key, source_month, fingerprints, changed (fingerprints
+            to transform) and removed (ids whose silver output is obsolete)
+    """
+    latest = {}
+    for key in sorted(keys):
+        source_month = parse_source_month(key)
+        if source_month is None:
+            print(f"Warning: skipping {key}, cannot determine its source month")
+            continue
+        latest[source_month] = key
+
+    plans = []
+    for source_month, key in sorted(latest.items()):
+        fingerprints = fingerprint_row_groups(bucket, key, filesystem)
+        previous_ids = {fingerprint["id"] for fingerprint in load_fingerprints(bucket, source_month)}
+        current_ids = {fingerprint["id"] for fingerprint in fingerprints}
+
+        changed = [fingerprint for fingerprint in fingerprints if fingerprint["id"] not in previous_ids]
+        removed = sorted(previous_ids - current_ids)
+        print(f"{source_month}: {len(changed)} of {len(fingerprints)} row groups changed, {len(removed)} removed")
+        plans.append({"key": key, "source_month": source_month, "fingerprints": fingerprints, "changed": changed, "removed": removed})
+    return plans
+
+
+def stage_row_groups(bucket: str, key: str, changed: List[Dict[str, Any]], filesystem: Optional[pafs.FileSystem] = None) -> List[str]:
+    """Copy changed row groups to single row group staging files for Spark to read
+
+    Args:
+        bucket (str): source S3 bucket containing raw files
+        key (str): S3 key of the bronze file
+        changed (list): fingerprints of the row groups to transform
+        filesystem (FileSystem): filesystem holding the bucket (default: S3FileSystem)
+
+    Returns:
+        list: staging keys, named so source_month and source_rg can be parsed from the path
+    """
+    filesystem = filesystem or pafs.S3FileSystem()
+    stem = key.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    staged = []
+    with filesystem.open_input_file(f"{bucket}/{key}") as source:
+        parquet_file = pq.ParquetFile(source)
+        for fingerprint in changed:
+            staged_key = f"{STAGING_PREFIX}{stem}/source_rg={fingerprint['id']}.parquet"
+            pq.write_table(parquet_file.read_row_group(fingerprint["index"]), f"{bucket}/{staged_key}", filesystem=filesystem)
+            staged.append(staged_key)
+    return staged
+
+
+def unchanged_row_groups(plans: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """List the row groups whose silver output and trip hashes stay valid
+
+    Trips are only deduplicated against the hashes of these row groups. Hashes of changed
+    and removed row groups belong to outputs this run replaces or deletes, so matching
+    against them would drop every unedited trip of a corrected row group.
+
+    Args:
+        plans (list): plans from plan_row_group_changes
+
+    Returns:
+        dict: fingerprint ids per source month, months without unchanged row groups are left out
+    """
+    unchanged = {}
+    for plan in plans:
+        changed_ids = {fingerprint["id"] for fingerprint in plan["changed"]}
+        ids = sorted({fingerprint["id"] for fingerprint in plan["fingerprints"]} - changed_ids)
+        if ids:
+            unchanged[plan["source_month"]] = ids
+    return unchanged
@@ -1,15 +1,93 @@
+import builtins
+import csv
+import io
 import json
 import sys
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import boto3
 from awsglue.context import GlueContext
 from awsglue.job import Job
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
+from botocore.exceptions import ClientError
+from bronze_row_groups import (
+    SOURCE_MONTH_PATTERN,
+    SOURCE_ROW_GROUP_PATTERN,
+    STAGING_PREFIX,
+    parse_source_month,
+    plan_row_group_changes,
+    save_fingerprints,
+    stage_row_groups,
+    unchanged_row_groups,
+)
 from pandas import DataFrame
 from pyspark.context import SparkContext
 from pyspark.sql.functions import *
+from pyspark.sql.types import DecimalType, StringType, StructType
+from pyspark.sql.utils import AnalysisException
+
+ZONE_LOOKUP_KEY = "reference/taxi_zone_lookup.csv"
+ZONE_ATTRIBUTES = {"borough": "Borough", "zone": "Zone", "service_zone": "service_zone"}
+
+# Zone tables already parsed in this process, keyed by (bucket, key, ETag)
+_zone_lookup_cache: Dict[Tuple[str, str, str], Dict[str, List[Optional[str]]]] = {}
+
+# Columns identifying a trip; republished months and re-downloads repeat these exactly
+TRIP_KEY_COLUMNS = ["VendorID", "tpep_pickup_datetime", "tpep_dropoff_datetime", "PULocationID", "DOLocationID", "fare_amount"]
+
+# Fixed silver type of each code/ID column, a value outside its range fails the run
+INTEGER_COLUMN_TYPES = {
+    "VendorID": "tinyint",
+    "RatecodeID": "tinyint",
+    "payment_type": "tinyint",
+    "passenger_count": "tinyint",
+    "PULocationID": "smallint",
+    "DOLocationID": "smallint",
+}
+INTEGER_TYPE_RANGES = {
+    "tinyint": (-(2**7), 2**7 - 1),
+    "smallint": (-(2**15), 2**15 - 1),
+}
+
+MONEY_COLUMNS = [
+    "fare_amount",
+    "extra",
+    "mta_tax",
+    "tip_amount",
+    "tolls_amount",
+    "improvement_surcharge",
+    "total_amount",
+    "congestion_surcharge",
+    "Airport_fee",
+]
+MONEY_TYPE = DecimalType(10, 2)
+
+# Page indexes (column/offset index) are written by parquet-mr by default; bloom filters make
+# point lookups on location IDs skip row groups whose min/max cannot rule the value out
+SILVER_WRITE_OPTIONS = {
+    "parquet.enable.dictionary": "true",
+    "parquet.page.row.count.limit": "20000",
+    "parquet.bloom.filter.enabled#PULocationID": "true",
+    "parquet.bloom.filter.expected.ndv#PULocationID": "300",
+    "parquet.bloom.filter.enabled#DOLocationID": "true",
+    "parquet.bloom.filter.expected.ndv#DOLocationID": "300",
+}
+
+# Bytes per value held by a reader for fixed width types, strings use a rough average
+TYPE_WIDTHS = {
+    "boolean": 1,
+    "tinyint": 1,
+    "smallint": 2,
+    "int": 4,
+    "float": 4,
+    "date": 4,
+    "bigint": 8,
+    "double": 8,
+    "timestamp": 8,
+    "timestamp_ntz": 8,
+}
+STRING_WIDTH = 16
 
 
 def invoke_lambda(function_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -27,13 +105,379 @@ def invoke_lambda(function_name: str, payload: Dict[str, Any]) -> Dict[str, Any]
     return json.loads(response["Payload"].read())
 
 
-def process_taxi_data(spark, source_bucket: str, files_to_process: List[str]) -> Optional[DataFrame]:
+def get_optional_args(argv: List[str], defaults: Dict[str, str]) -> Dict[str, str]:
+    """Resolve optional Glue job parameters, falling back to defaults
+
+    Args:
+        argv (list): command line arguments passed to the job
+        defaults (dict): optional parameter names mapped to their default values
+
+    Returns:
+        dict: resolved optional parameters
+    """
+    present = [name for name in defaults if f"--{name}" in argv]
+    resolved = getResolvedOptions(argv, present) if present else {}
+    return {name: resolved.get(name, default) for name, default in defaults.items()}
+
+
+def discover_files(lambda_function_name: str, bucket: str, queue_url: str, full_listing: bool) -> Dict[str, List[str]]:
+    """Find bronze files to process from the S3 event queue or a full listing
+
+    Args:
+        lambda_function_name (str): name/ARN of the s3_operations Lambda function
+        bucket (str): source S3 bucket containing raw files
+        queue_url (str): SQS queue URL buffering new-object events (empty to disable)
+        full_listing (bool): list the whole bronze prefix instead of draining the queue
+
+    Returns:
+        dict: unprocessed file keys and receipt handles of drained queue messages
+
+    Raises:
+        Exception: if the Lambda function returns an error
+    """
+    if full_listing or not queue_url:
+        payload = {"action": "get_unprocessed", "bucket": bucket, "prefix": "nyc_taxi/"}
+    else:
+        payload = {"action": "get_queued", "bucket": bucket, "prefix": "nyc_taxi/", "queue_url": queue_url}
+
+    lambda_response = invoke_lambda(lambda_function_name, payload)
+    if lambda_response["statusCode"] != 200:
+        raise Exception(f"Lambda error: {lambda_response['body']}")
+
+    return {"unprocessed_files": lambda_response["body"]["unprocessed_files"], "receipt_handles": lambda_response["body"].get("receipt_handles", [])}
+
+
+def delete_prefix(bucket: str, prefix: str) -> None:
+    """Delete all objects under an S3 prefix
+
+    Args:
+        bucket (str): S3 bucket name
+        prefix (str): S3 prefix to delete
+
+    Returns:
+        None: removes the objects
+    """
+    s3 = boto3.client("s3")
+    for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+        if objects:
+            s3.delete_objects(Bucket=bucket, Delete={"Objects": objects})
+
+
+def list_payment_prefixes(bucket: str) -> List[str]:
+    """List the payment_type partition prefixes of the silver dataset
+
+    Args:
+        bucket (str): target S3 bucket
+
+    Returns:
+        list: prefixes such as cleaned/payment_type=1/
+    """
+    s3 = boto3.client("s3")
+    return [
+        prefix["Prefix"]
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix="cleaned/", Delimiter="/")
+        for prefix in page.get("CommonPrefixes", [])
+    ]
+
+
+def remove_row_group_outputs(bucket: str, source_month: str, row_group_ids: List[str]) -> None:
+    """Delete the silver files and trip hashes derived from obsolete bronze row groups
+
+    Args:
+        bucket (str): target S3 bucket
+        source_month (str): year-month of the bronze file
+        row_group_ids (list): fingerprint ids of row groups no longer in the bronze file
+
+    Returns:
+        None: removes the affected silver and hash set partitions
+    """
+    if not row_group_ids:
+        return
+
+    payment_prefixes = list_payment_prefixes(bucket)
+    for row_group_id in row_group_ids:
+        for payment_prefix in payment_prefixes:
+            delete_prefix(bucket, f"{payment_prefix}source_month={source_month}/source_rg={row_group_id}/")
+        delete_prefix(bucket, f"_dedup/trip_hashes/source_month={source_month}/source_rg={row_group_id}/")
+
+
+def load_zone_lookup(bucket: str, key: str = ZONE_LOOKUP_KEY) -> Optional[Dict[str, List[Optional[str]]]]:
+    """Load the TLC taxi zone lookup as arrays indexed by LocationID
+
+    The parsed table is cached in memory per object version (ETag), so repeated calls
+    only cost a HEAD request until the lookup file is replaced.
+
+    Args:
+        bucket (str): S3 bucket holding the zone lookup csv
+        key (str): S3 key of the zone lookup csv (default: reference/taxi_zone_lookup.csv)
+
+    Returns:
+        dict: attribute name mapped to a list where position i holds the value of LocationID i,
+            or None if the lookup file does not exist
+
+    Raises:
+        ClientError: if the lookup file exists but cannot be read
+    """
+    s3 = boto3.client("s3")
+    try:
+        version = s3.head_object(Bucket=bucket, Key=key)["ETag"]
+    except ClientError as e:
+        # Access or throttling errors must fail the run rather than write batches without zone columns
+        if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+            raise
+        print(f"Zone lookup s3://{bucket}/{key} not found, skipping enrichment")
+        return None
+
+    cache_key = (bucket, key, version)
+    if cache_key not in _zone_lookup_cache:
+        body = s3.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8")
+        rows = list(csv.DictReader(io.StringIO(body)))
+        # max is shadowed by the pyspark.sql.functions star import
+        size = builtins.max(int(row["LocationID"]) for row in rows) + 1
+
+        lookup = {attribute: [None] * size for attribute in ZONE_ATTRIBUTES}
+        for row in rows:
+            for attribute, csv_column in ZONE_ATTRIBUTES.items():
+                lookup[attribute][int(row["LocationID"])] = row[csv_column]
+        _zone_lookup_cache[cache_key] = lookup
+
+    return _zone_lookup_cache[cache_key]
+
+
+def enrich_with_zones(df: DataFrame, zone_lookup: Dict[str, List[Optional[str]]]) -> DataFrame:
+    """Add pickup/dropoff borough, zone and service zone from the zone lookup
+
+    The lookup arrays are shipped to executors as literal array constants and indexed by
+    location ID, so no join or shuffle is planned. The repeated strings are dictionary
+    encoded by the parquet writer.
+
+    Args:
+        df (DataFrame): trips with PULocationID and DOLocationID columns
+        zone_lookup (dict): arrays indexed by LocationID from load_zone_lookup
+
+    Returns:
+        DataFrame: trips with pickup_*/dropoff_* zone attribute columns
+    """
+    for attribute, values in zone_lookup.items():
+        values_array = array(*[lit(value).cast("string") for value in values])
+        for prefix, location_column in (("pickup", "PULocationID"), ("dropoff", "DOLocationID")):
+            # try_element_at is 1-based and counts negative indexes from the end, so only
+            # in-range IDs are looked up and every other ID yields null
+            location_id = col(location_column).cast("int")
+            df = df.withColumn(f"{prefix}_{attribute}", when(location_id.between(0, len(values) - 1), try_element_at(values_array, location_id + 1)))
+    return df
+
+
+def deduplicate_trips(spark, df: DataFrame, hash_path: str, unchanged: Dict[str, List[str]]) -> DataFrame:
+    """Drop trips repeated within the batch or already written by earlier runs
+
+    A 64-bit xxhash over TRIP_KEY_COLUMNS is computed column-wise for every row. Rows are
+    deduplicated on that hash within the batch and then anti-joined against the hash set,
+    which holds only (source_month, source_rg, row_hash) rows. Only the hashes of the
+    unchanged row groups of the same months are matched; changed and removed row groups
+    are replaced by this run, so their trips must be written again.
+
+    Args:
+        spark (SparkSession): active Spark session
+        df (DataFrame): trips with source_month and source_rg columns
+        hash_path (str): location of the per-month trip hash sets
+        unchanged (dict): unchanged row group ids per month from unchanged_row_groups
+
+    Returns:
+        DataFrame: trips not seen before, with an added row_hash column
+    """
+    df = df.withColumn("row_hash", xxhash64(*TRIP_KEY_COLUMNS)).dropDuplicates(["row_hash"])
+    if not unchanged:
+        return df
+
+    row_group_ids = sorted({row_group_id for ids in unchanged.values() for row_group_id in ids})
+    try:
+        seen_hashes = (
+            spark.read.parquet(hash_path).where(col("source_month").isin(sorted(unchanged)) & col("source_rg").isin(row_group_ids)).select("row_hash")
+        )
+    except AnalysisException:
+        # No hash set written yet
+        return df
+
+    return df.join(broadcast(seen_hashes), "row_hash", "left_anti")
+
+
+def record_trip_hashes(df: DataFrame, hash_path: str) -> None:
+    """Replace the hash set partitions of the row groups written in this run
+
+    Args:
+        df (DataFrame): deduplicated trips with source_month, source_rg and row_hash columns
+        hash_path (str): location of the per-month trip hash sets
+
+    Returns:
+        None: writes hashes partitioned by source_month and source_rg
+    """
+    df.select("source_month", "source_rg", "row_hash").write.mode("overwrite").option("partitionOverwriteMode", "dynamic").partitionBy(
+        "source_month", "source_rg"
+    ).parquet(hash_path)
+
+
+def optimize_types(df: DataFrame) -> DataFrame:
+    """Store silver columns in compact types
+
+    Integer code/ID columns are cast to their fixed type from INTEGER_COLUMN_TYPES, so every
+    file of the silver dataset shares one schema. A value outside the type's range raises an
+    error when the rows are computed instead of being wrapped around or nulled; the check is
+    part of the projection, so it costs no extra pass over the data. store_and_fwd_flag
+    becomes a boolean and money columns fixed-scale decimals. Categorical strings are left to
+    the writer's dictionary encoding.
+
+    Args:
+        df (DataFrame): trips with TLC column types
+
+    Returns:
+        DataFrame: trips with compact column types
+    """
+    integer_columns = [column for column in INTEGER_COLUMN_TYPES if column in df.columns]
+    for column in integer_columns:
+        type_name = INTEGER_COLUMN_TYPES[column]
+        in_range = col(column).isNull() | col(column).between(*INTEGER_TYPE_RANGES[type_name])
+        out_of_range_error = raise_error(concat(lit(f"{column} value "), col(column).cast("string"), lit(f" does not fit {type_name}")))
+        df = df.withColumn(column, when(in_range, col(column).cast(type_name)).otherwise(out_of_range_error))
+
+    if "store_and_fwd_flag" in df.columns:
+        df = df.withColumn("store_and_fwd_flag", when(col("store_and_fwd_flag") == "Y", True).when(col("store_and_fwd_flag") == "N", False))
+
+    for column in MONEY_COLUMNS:
+        if column in df.columns:
+            df = df.withColumn(column, col(column).cast(MONEY_TYPE))
+
+    return df
+
+
+def estimate_row_bytes(schema: StructType, columns: List[str]) -> int:
+    """Estimate the in-memory bytes per row a reader needs for the given columns
+
+    Args:
+        schema (StructType): schema holding the columns
+        columns (list): column names to include
+
+    Returns:
+        int: estimated bytes per row
+    """
+    total = 0
+    for field in schema.fields:
+        if field.name not in columns:
+            continue
+        if isinstance(field.dataType, DecimalType):
+            total += 8 if field.dataType.precision <= 18 else 16
+        elif isinstance(field.dataType, StringType):
+            total += STRING_WIDTH
+        else:
+            total += TYPE_WIDTHS.get(field.dataType.simpleString(), 8)
+    return total
+
+
+def get_input_bytes(bucket: str, keys: List[str]) -> int:
+    """Sum the sizes of the bronze files processed in this run
+
+    Args:
+        bucket (str): source S3 bucket containing raw files
+        keys (list): processed file keys
+
+    Returns:
+        int: total size in bytes
+    """
+    s3 = boto3.client("s3")
+    return builtins.sum(s3.head_object(Bucket=bucket, Key=key)["ContentLength"] for key in keys)
+
+
+def get_written_bytes(bucket: str, partitions: List[Tuple[str, str]]) -> int:
+    """Sum the sizes of the silver parquet files of the row group partitions written in this run
+
+    Args:
+        bucket (str): target S3 bucket
+        partitions (list): (source_month, source_rg) pairs written in this run
+
+    Returns:
+        int: total size in bytes
+    """
+    s3 = boto3.client("s3")
+    written = 0
+    for payment_prefix in list_payment_prefixes(bucket):
+        for source_month, row_group_id in partitions:
+            prefix = f"{payment_prefix}source_month={source_month}/source_rg={row_group_id}/"
+            for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+                written += builtins.sum(obj["Size"] for obj in page.get("Contents", []) if obj["Key"].endswith(".parquet"))
+    return written
+
+
+def report_type_savings(raw_schema: StructType, silver_schema: StructType, rows: int, input_bytes: int, output_bytes: int) -> Dict[str, float]:
+    """Print the storage and reader memory change from the silver column types
+
+    Args:
+        raw_schema (StructType): schema of the bronze files
+        silver_schema (StructType): schema written to silver
+        rows (int): rows written in this run
+        input_bytes (int): on-disk size of the bronze files
+        output_bytes (int): on-disk size of the silver files written
+
+    Returns:
+        dict: on-disk and estimated reader memory sizes before and after
+    """
+    shared_columns = [name for name in raw_schema.names if name in silver_schema.names]
+    report = {
+        "disk_bytes_before": input_bytes,
+        "disk_bytes_after": output_bytes,
+        "memory_bytes_before": estimate_row_bytes(raw_schema, shared_columns) * rows,
+        "memory_bytes_after": estimate_row_bytes(silver_schema, shared_columns) * rows,
+    }
+    for kind in ("disk", "memory"):
+        before, after = report[f"{kind}_bytes_before"], report[f"{kind}_bytes_after"]
+        reduction = (1 - after / before) * 100 if before else 0.0
+        print(f"Silver {kind} size: {before / 1024**2:.1f} MB -> {after / 1024**2:.1f} MB ({reduction:.1f}% smaller)")
+    return report
+
+
+def write_silver(df: DataFrame, target_path: str) -> None:
+    """Write trips to silver clustered by pickup location and sorted by pickup time
+
+    Files are partitioned by payment_type and by the bronze month and row group they come from.
+    Partitions are overwritten dynamically, so a changed row group only replaces its own files
+    and a rerun after a failure rewrites them instead of appending duplicates. Rows are range
+    partitioned on (payment_type, source_month, source_rg, PULocationID), so each file covers a contiguous
+    span of pickup locations, and ordered by (PULocationID, tpep_pickup_datetime) within files.
+    The sort leads with the partitionBy columns; otherwise the writer re-sorts each task by
+    them and the location/time order is lost. File, row group and page min/max statistics
+    then cover narrow ranges, so selective location/time reads skip most of the data.
+
+    Args:
+        df (DataFrame): silver trips
+        target_path (str): silver dataset location
+
+    Returns:
+        None: writes parquet files partitioned by payment_type, source_month and source_rg
+    """
+    df = df.repartitionByRange("payment_type", "source_month", "source_rg", "PULocationID").sortWithinPartitions(
+        "payment_type", "source_month", "source_rg", "PULocationID", "tpep_pickup_datetime"
+    )
+    writer = df.write.mode("overwrite").option("partitionOverwriteMode", "dynamic").options(**SILVER_WRITE_OPTIONS)
+    writer.partitionBy("payment_type", "source_month", "source_rg").parquet(target_path)
+
+
+def process_taxi_data(
+    spark,
+    source_bucket: str,
+    files_to_process: List[str],
+    hash_path: Optional[str] = None,
+    zone_lookup: Optional[Dict[str, List[Optional[str]]]] = None,
+    unchanged: Optional[Dict[str, List[str]]] = None,
+) -> Optional[DataFrame]:
     """Process raw taxi data files into silver format
 
     Args:
         spark (SparkSession): active Spark session
         source_bucket (str): source S3 bucket containing raw files
-        files_to_process (list): list of files to process
+        files_to_process (list): list of files to process, staged row groups from stage_row_groups
+        hash_path (str): location of the per-month trip hash sets, skips deduplication if None (default: None)
+        zone_lookup (dict): zone attribute arrays from load_zone_lookup, skips enrichment if None (default: None)
+        unchanged (dict): row group ids per month whose trip hashes stay valid, from unchanged_row_groups (default: None)
 
     Returns:
         DataFrame: processed Spark DataFrame or None if no files
@@ -43,6 +487,14 @@ def process_taxi_data(spark, source_bucket: str, files_to_process: List[str]) ->
 
     input_paths = [f"s3://{source_bucket}/{file}" for file in files_to_process]
     df = spark.read.parquet(*input_paths)
+    df = df.withColumn("source_month", regexp_extract(input_file_name(), SOURCE_MONTH_PATTERN, 1))
+    df = df.withColumn("source_rg", regexp_extract(input_file_name(), SOURCE_ROW_GROUP_PATTERN, 1))
+
+    if hash_path:
+        df = deduplicate_trips(spark, df, hash_path, unchanged or {})
+    if zone_lookup:
+        df = enrich_with_zones(df, zone_lookup)
+    df = optimize_types(df)
     ## Other Tranformation Operations
     return df
 
@@ -60,43 +512,86 @@ def main() -> None:
         Exception: if processing fails
     """
     args = getResolvedOptions(sys.argv, ["JOB_NAME", "source_bucket", "target_bucket", "lambda_function_name"])
+    args.update(get_optional_args(sys.argv, {"queue_url": "", "full_listing": "false", "zone_lookup_key": ZONE_LOOKUP_KEY}))
 
     sc = SparkContext()
     glueContext = GlueContext(sc)
     spark = glueContext.spark_session
+    # Spark writes INT96 timestamps by default, which carry no min/max statistics or page index
+    # bounds, so the pickup time sort of write_silver could not skip anything. Session level only.
+    spark.conf.set("spark.sql.parquet.outputTimestampType", "TIMESTAMP_MICROS")
     job = Job(glueContext)
     job.init(args["JOB_NAME"], args)
 
     try:
-        lambda_response = invoke_lambda(
-            args["lambda_function_name"], {"action": "get_unprocessed", "bucket": args["source_bucket"], "prefix": "nyc_taxi/"}
-        )
+        discovered = discover_files(args["lambda_function_name"], args["source_bucket"], args["queue_url"], args["full_listing"].lower() == "true")
+        unprocessed_files = discovered["unprocessed_files"]
 
-        if lambda_response["statusCode"] != 200:
-            raise Exception(f"Lambda error: {lambda_response['body']}")
+        if unprocessed_files:
+            hash_path = f"s3://{args['target_bucket']}/_dedup/trip_hashes/"
 
-        unprocessed_files = lambda_response["body"]["unprocessed_files"]
+            # Only row groups that differ from the previous version of their month are transformed
+            plans = plan_row_group_changes(args["source_bucket"], unprocessed_files)
+            staged_files = []
+            for plan in plans:
+                staged_files += stage_row_groups(args["source_bucket"], plan["key"], plan["changed"])
 
-        if unprocessed_files:
-            df_silver = process_taxi_data(spark, args["source_bucket"], unprocessed_files)
+            zone_lookup = load_zone_lookup(args["source_bucket"], args["zone_lookup_key"])
+            df_silver = process_taxi_data(spark, args["source_bucket"], staged_files, hash_path, zone_lookup, unchanged_row_groups(plans))
 
             if df_silver is not None:
+                # Materialize once, the silver write, the hash write and the report reuse the result
+                df_silver = df_silver.localCheckpoint()
                 target_path = f"s3://{args['target_bucket']}/cleaned/"
-                df_silver.write.mode("append").partitionBy("payment_type").parquet(target_path)
-
-                for file_key in unprocessed_files:
-                    # Mark as processed
-                    invoke_lambda(args["lambda_function_name"], {"action": "mark_processed", "bucket": args["source_bucket"], "key": file_key})
-
-                    # Archive file
-                    # invoke_lambda(args['lambda_function_name'], {
-                    #     'action': 'archive',
-                    #     'bucket': args['source_bucket'],
-                    #     'key': file_key
-                    # })
+                write_silver(df_silver.drop("row_hash"), target_path)
+                record_trip_hashes(df_silver, hash_path)
+
+                report_type_savings(
+                    spark.read.parquet(*[f"s3://{args['source_bucket']}/{key}" for key in staged_files]).schema,
+                    df_silver.schema,
+                    df_silver.count(),
+                    get_input_bytes(args["source_bucket"], staged_files),
+                    get_written_bytes(
+                        args["target_bucket"], [(plan["source_month"], row_group["id"]) for plan in plans for row_group in plan["changed"]]
+                    ),
+                )
+
+            # Obsolete outputs are only dropped once their replacement is written
+            for plan in plans:
+                remove_row_group_outputs(args["target_bucket"], plan["source_month"], plan["removed"])
+                save_fingerprints(args["source_bucket"], plan["source_month"], plan["key"], plan["fingerprints"])
+            delete_prefix(args["source_bucket"], STAGING_PREFIX)
+
+            for file_key in unprocessed_files:
+                # Mark as processed, keys plan_row_group_changes skipped as failed
+                status = {"action": "mark_processed", "bucket": args["source_bucket"], "key": file_key}
+                if parse_source_month(file_key) is None:
+                    status.update({"status": "Failed", "error": "Cannot determine the source month from the key"})
+                invoke_lambda(args["lambda_function_name"], status)
+
+                # Archive file
+                # invoke_lambda(args['lambda_function_name'], {
+                #     'action': 'archive',
+                #     'bucket': args['source_bucket'],
+                #     'key': file_key
+                # })
         else:
             print("No new files to process")
 
+        if discovered["receipt_handles"]:
+            ack_response = invoke_lambda(
+                args["lambda_function_name"],
+                {
+                    "action": "ack_queued",
+                    "bucket": args["source_bucket"],
+                    "queue_url": args["queue_url"],
+                    "receipt_handles": discovered["receipt_handles"],
+                },
+            )
+            if ack_response["statusCode"] != 200:
+                # The files are already marked processed, redelivered messages are skipped by ETag
+                print(f"Warning: could not acknowledge queued messages: {ack_response['body']}")
+
     except Exception as e:
         print(f"Error processing data: {str(e)}")
         raise
@@ -1,40 +1,203 @@
+import base64
+import hashlib
 import logging
 import os
+import zlib
 from datetime import datetime
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 
 import boto3
 import requests
+from botocore.exceptions import ClientError
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Stop reading the source this long before the Lambda timeout, leaves time to abort the upload
+DEADLINE_MARGIN_MS = 20000
+# Connect and per-read timeout in seconds, one stalled read must end well within the margin
+REQUEST_TIMEOUT = (10, 10)
+READ_CHUNK_SIZE = 64 * 1024  # the deadline is checked between reads of this size
+PART_SIZE = 8 * 1024 * 1024  # multipart part size, S3 requires at least 5 MB for all but the last part
 
-def download_and_upload_to_s3(url: str, bucket: str, year_month: str) -> str:
+
+class TransferDeadlineExceeded(Exception):
+    """Raised when the Lambda deadline is too close to continue a transfer"""
+
+
+class TransferVerificationError(Exception):
+    """Raised when the uploaded object does not match the downloaded bytes"""
+
+
+def crc32_base64(crc32: int) -> str:
+    """Encode a CRC32 in the base64 big-endian form S3 uses"""
+    return base64.b64encode(crc32.to_bytes(4, "big")).decode("ascii")
+
+
+class ChecksummingStream:
+    """File-like wrapper computing CRC32 and SHA-256 of the bytes read through it
+
+    Reads the source in READ_CHUNK_SIZE chunks and checks the remaining Lambda time before
+    each one, so a transfer is aborted while there is still time to clean up instead of
+    being killed mid-upload.
+    """
+
+    def __init__(self, raw: Any, context: Any = None, deadline_margin_ms: int = DEADLINE_MARGIN_MS):
+        self.raw = raw
+        self.context = context
+        self.deadline_margin_ms = deadline_margin_ms
+        self.bytes_read = 0
+        self.crc32 = 0
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+        remaining = size
+        while remaining != 0:
+            if self.context is not None and self.context.get_remaining_time_in_millis() < self.deadline_margin_ms:
+                raise TransferDeadlineExceeded(f"Aborting transfer after {self.bytes_read} bytes, Lambda deadline is near")
+
+            data = self.raw.read(READ_CHUNK_SIZE if remaining < 0 else min(remaining, READ_CHUNK_SIZE))
+            if not data:
+                break
+            self.crc32 = zlib.crc32(data, self.crc32)
+            self.sha256.update(data)
+            self.bytes_read += len(data)
+            chunks.append(data)
+            if remaining > 0:
+                remaining -= len(data)
+        return b"".join(chunks)
+
+    @property
+    def crc32_base64(self) -> str:
+        """CRC32 in the base64 big-endian form S3 reports"""
+        return crc32_base64(self.crc32)
+
+
+def upload_stream(s3_client: Any, bucket: str, key: str, stream: ChecksummingStream) -> None:
+    """Upload a stream with a full-object CRC32 that S3 validates
+
+    A source smaller than one part is sent with put_object. Larger sources are sent as a
+    multipart upload of PART_SIZE parts with ChecksumType FULL_OBJECT, and the CRC32 of the
+    whole stream is passed on completion, so S3 rejects the object if the bytes it stored
+    differ from the bytes read. An unfinished multipart upload is aborted.
+
+    Args:
+        s3_client (S3.Client): S3 client
+        bucket (str): destination bronze bucket name
+        key (str): object key to write
+        stream (ChecksummingStream): source stream
+
+    Raises:
+        TransferVerificationError: if S3 rejects the CRC32 of the stored bytes
+    """
+    part = stream.read(PART_SIZE)
+    if len(part) < PART_SIZE:
+        try:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=part, ChecksumAlgorithm="CRC32", ChecksumCRC32=stream.crc32_base64)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "BadDigest":
+                raise TransferVerificationError(f"S3 rejected the CRC32 of {key}: {str(e)}") from e
+            raise
+        return
+
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ChecksumAlgorithm="CRC32", ChecksumType="FULL_OBJECT")["UploadId"]
+    try:
+        parts = []
+        while part:
+            part_number = len(parts) + 1
+            checksum = crc32_base64(zlib.crc32(part))
+            response = s3_client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=part, ChecksumCRC32=checksum)
+            parts.append({"PartNumber": part_number, "ETag": response["ETag"], "ChecksumCRC32": checksum})
+            part = stream.read(PART_SIZE)
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+            ChecksumCRC32=stream.crc32_base64,
+            ChecksumType="FULL_OBJECT",
+        )
+    except BaseException as e:
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        if isinstance(e, ClientError) and e.response["Error"]["Code"] == "BadDigest":
+            raise TransferVerificationError(f"S3 rejected the CRC32 of {key}: {str(e)}") from e
+        raise
+
+
+def verify_upload(s3_client: Any, bucket: str, key: str, stream: ChecksummingStream, expected_length: Optional[int]) -> None:
+    """Check the uploaded object against the source length and the streamed checksum
+
+    Args:
+        s3_client (S3.Client): S3 client used for the upload
+        bucket (str): destination bronze bucket name
+        key (str): uploaded object key
+        stream (ChecksummingStream): stream the object was uploaded from
+        expected_length (int): Content-Length announced by the source, None if unknown
+
+    Raises:
+        TransferVerificationError: if the source was truncated or S3 holds different bytes
+    """
+    if expected_length is not None and stream.bytes_read != expected_length:
+        raise TransferVerificationError(f"Source stream truncated: read {stream.bytes_read} of {expected_length} bytes")
+
+    head = s3_client.head_object(Bucket=bucket, Key=key, ChecksumMode="ENABLED")
+    if head["ContentLength"] != stream.bytes_read:
+        raise TransferVerificationError(f"Uploaded {head['ContentLength']} bytes but read {stream.bytes_read}")
+
+    if head.get("ChecksumType", "FULL_OBJECT") != "FULL_OBJECT" or head.get("ChecksumCRC32") != stream.crc32_base64:
+        raise TransferVerificationError(
+            f"CRC32 mismatch: S3 has {head.get('ChecksumType', 'FULL_OBJECT')} {head.get('ChecksumCRC32')}, streamed {stream.crc32_base64}"
+        )
+
+
+def download_and_upload_to_s3(url: str, bucket: str, year_month: str, context: Any = None) -> str:
     """Download the Data from url and upload to the bronze nyc bucket
 
+    The response is streamed to S3 one part at a time. CRC32 and SHA-256 are computed as bytes
+    pass through, S3 validates the full-object CRC32, and the final object is checked against
+    the source Content-Length and the streamed CRC32. A partial object is deleted on failure.
+
     Args:
         url (str): url to download data from
         bucket (str): destination bronze bucket name
         year_month (str): processing month for raw data
         (Nyc data update monthly Jan1, dec month data is available)
+        context (object): Lambda context used to abort before the timeout (default: None)
 
     Returns:
         str: final s3 uri(include file path in the bucket)
+
+    Raises:
+        TransferDeadlineExceeded: if the Lambda deadline is reached during the transfer
+        TransferVerificationError: if the uploaded object does not match the source
     """
     try:
         logger.info(f"Downloading data from: {url}")
 
-        response = requests.get(url, stream=True)
+        response = requests.get(url, stream=True, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
+        content_length = response.headers.get("Content-Length")
+        expected_length = int(content_length) if content_length is not None else None
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         key = f"nyc_taxi/yellow_taxi_{year_month}_{timestamp}.parquet"
 
         s3_client = boto3.client("s3")
-        s3_client.upload_fileobj(response.raw, bucket, key)
-
-        logger.info(f"Successfully uploaded data to s3://{bucket}/{key}")
+        stream = ChecksummingStream(response.raw, context)
+        try:
+            upload_stream(s3_client, bucket, key, stream)
+            verify_upload(s3_client, bucket, key, stream, expected_length)
+        except (TransferDeadlineExceeded, TransferVerificationError):
+            # A failed multipart upload is already aborted, remove a completed but invalid object
+            s3_client.delete_object(Bucket=bucket, Key=key)
+            raise
+        finally:
+            response.close()
+
+        logger.info(
+            f"Successfully uploaded {stream.bytes_read} bytes to s3://{bucket}/{key} (crc32={stream.crc32_base64}, sha256={stream.sha256.hexdigest()})"
+        )
         return key
 
     except Exception as e:
@@ -63,7 +226,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Union[int,
         if not url or not year_month:
             raise ValueError("Missing required parameters: 'url' or 'year_month'")
 
-        s3_key = download_and_upload_to_s3(url, bucket_name, year_month)
+        s3_key = download_and_upload_to_s3(url, bucket_name, year_month, context)
 
         return {
             "statusCode": 200,
@@ -74,6 +237,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Union[int,
         logger.error(f"Validation error: {str(e)}")
         return {"statusCode": 400, "body": {"error": str(e), "message": "Invalid input parameters"}}
 
+    except TransferDeadlineExceeded as e:
+        logger.error(f"Transfer aborted: {str(e)}")
+        return {"statusCode": 504, "body": {"error": str(e), "message": "Transfer aborted before the Lambda timeout"}}
+
     except Exception as e:
         logger.error(f"Error processing taxi data: {str(e)}")
         return {"statusCode": 500, "body": {"error": str(e), "message": "Failed to process taxi data"}}
@@ -1,11 +1,15 @@
 import json
 import logging
 import os
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, Tuple, Union
 
 import boto3
 import requests
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dateutil.relativedelta import relativedelta
 
@@ -13,6 +17,14 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 ROOT_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data/"
+DATASET = "yellow_tripdata"
+
+LEASE_DURATION_SECONDS = 120  # a crashed run's lease can be taken over after this
+LEASE_HEARTBEAT_SECONDS = 30
+LEASE_RENEW_ATTEMPTS = 3
+
+# Wait for the synchronous downloader (300s timeout) and never re-invoke it on a read timeout
+PROCESSOR_CLIENT_CONFIG = Config(read_timeout=310, retries={"max_attempts": 0})
 
 
 def check_url_exists(url: str) -> bool:
@@ -94,6 +106,146 @@ def update_last_processed_date(table_name: str, year_month: str) -> bool:
         return False
 
 
+def acquire_lease(table_name: str, dataset: str, year_month: str, owner: str, duration: int = LEASE_DURATION_SECONDS) -> bool:
+    """
+    Acquire the processing lease of a dataset month with a DynamoDB conditional write
+
+    The write only succeeds if no lease exists or the existing lease has expired,
+    so at most one orchestrator processes a month at a time.
+
+    Args:
+        table_name (str): DynamoDB table name
+        dataset (str): dataset name, e.g. yellow_tripdata
+        year_month (str): Year-month string being processed
+        owner (str): unique id of this run
+        duration (int): seconds until the lease expires without a heartbeat
+
+    Returns:
+        bool: True if the lease is now held by owner, False if another run holds it
+    """
+    dynamodb = boto3.resource("dynamodb")
+    table = dynamodb.Table(table_name)
+    now = int(time.time())
+    try:
+        table.put_item(
+            Item={
+                "id": f"lease#{dataset}#{year_month}",
+                "lease_owner": owner,
+                "expires_at": now + duration,
+                "acquired_at": datetime.now().isoformat(),
+            },
+            ConditionExpression="attribute_not_exists(id) OR expires_at < :now",
+            ExpressionAttributeValues={":now": now},
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+
+
+def renew_lease(table_name: str, dataset: str, year_month: str, owner: str, duration: int = LEASE_DURATION_SECONDS) -> bool:
+    """
+    Extend the expiry of a lease still held by owner
+
+    Args:
+        table_name (str): DynamoDB table name
+        dataset (str): dataset name, e.g. yellow_tripdata
+        year_month (str): Year-month string being processed
+        owner (str): unique id of this run
+        duration (int): seconds from now until the lease expires
+
+    Returns:
+        bool: True if renewed, False if the lease is held by another owner
+
+    Raises:
+        ClientError: if the renewal keeps failing for another reason, e.g. throttling
+    """
+    dynamodb = boto3.resource("dynamodb")
+    table = dynamodb.Table(table_name)
+    for attempt in range(1, LEASE_RENEW_ATTEMPTS + 1):
+        try:
+            table.update_item(
+                Key={"id": f"lease#{dataset}#{year_month}"},
+                UpdateExpression="SET expires_at = :expires_at",
+                ConditionExpression="lease_owner = :owner",
+                ExpressionAttributeValues={":expires_at": int(time.time()) + duration, ":owner": owner},
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            logger.error(f"Error renewing lease (attempt {attempt}): {str(e)}")
+            if attempt == LEASE_RENEW_ATTEMPTS:
+                raise
+            time.sleep(2**attempt)
+
+
+def release_lease(table_name: str, dataset: str, year_month: str, owner: str) -> None:
+    """
+    Delete a lease if it is still held by owner
+
+    Args:
+        table_name (str): DynamoDB table name
+        dataset (str): dataset name, e.g. yellow_tripdata
+        year_month (str): Year-month string being processed
+        owner (str): unique id of this run
+    """
+    try:
+        dynamodb = boto3.resource("dynamodb")
+        table = dynamodb.Table(table_name)
+        table.delete_item(
+            Key={"id": f"lease#{dataset}#{year_month}"}, ConditionExpression="lease_owner = :owner", ExpressionAttributeValues={":owner": owner}
+        )
+    except ClientError as e:
+        logger.error(f"Error releasing lease: {str(e)}")
+
+
+class LeaseHeartbeat(threading.Thread):
+    """Background thread renewing a lease while the download is in flight
+
+    The lease counts as lost once another owner holds it, or once renewals have failed
+    for longer than the lease duration so another run may have taken it over.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        dataset: str,
+        year_month: str,
+        owner: str,
+        interval: int = LEASE_HEARTBEAT_SECONDS,
+        duration: int = LEASE_DURATION_SECONDS,
+    ):
+        super().__init__(daemon=True)
+        self.table_name = table_name
+        self.dataset = dataset
+        self.year_month = year_month
+        self.owner = owner
+        self.interval = interval
+        self.duration = duration
+        self.lost = False
+        self.last_renewed = time.time()
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                if renew_lease(self.table_name, self.dataset, self.year_month, self.owner, self.duration):
+                    self.last_renewed = time.time()
+                    continue
+            except ClientError:
+                if time.time() - self.last_renewed < self.duration:
+                    continue
+            self.lost = True
+            logger.error(f"Lost lease for {self.dataset} {self.year_month}")
+            return
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
 def notify(subject: str, message: str) -> None:
     """
     Send SNS notification about processing status
@@ -111,6 +263,59 @@ def notify(subject: str, message: str) -> None:
         logger.error(f"Failed to send notification: {str(e)}")
 
 
+def process_month(table_name: str, url: str, year_month: str, heartbeat: LeaseHeartbeat) -> Dict[str, Union[int, str]]:
+    """
+    Download a month through the processor function while holding its lease
+
+    Args:
+        table_name (str): DynamoDB table name
+        url (str): URL of the monthly data file
+        year_month (str): Year-month string being processed
+        heartbeat (LeaseHeartbeat): heartbeat of the lease held for the month
+
+    Returns:
+        dict: processing status and results
+
+    Raises:
+        Exception: if the processor fails, the lease was lost or the status cannot be stored
+    """
+    # Check if we've already processed this month, read under the lease so a run finishing just before is seen
+    last_processed = get_last_processed_date(table_name)
+    if last_processed and last_processed >= year_month:
+        message = f"Data for {year_month} has already been processed"
+        notify("NYC Taxi Data Processing Skip", message)
+        return {"statusCode": 200, "body": json.dumps(message)}
+
+    # Process the data
+    logger.info(f"Processing data for {year_month} from URL: {url}")
+    payload = {"url": url, "year_month": year_month}
+
+    lambda_client = boto3.client("lambda", config=PROCESSOR_CLIENT_CONFIG)
+    processor_response = lambda_client.invoke(
+        FunctionName=os.environ["PROCESSOR_FUNCTION_NAME"], InvocationType="RequestResponse", Payload=json.dumps(payload)
+    )
+
+    response_payload = json.loads(processor_response["Payload"].read())
+    logger.info(f"Processor response: {response_payload}")
+
+    if processor_response["StatusCode"] == 200 and response_payload.get("statusCode") == 200:
+        # Another run may own the month now, leave the processing status to it
+        if heartbeat.lost:
+            raise Exception(f"Lease for {year_month} was lost during processing, not updating processing status")
+
+        # Update the last processed date
+        if update_last_processed_date(table_name, year_month):
+            message = f"Successfully processed NYC taxi data for {year_month}"
+            notify("NYC Taxi Data Processing Success", message)
+            return {"statusCode": 200, "body": json.dumps(message)}
+        else:
+            raise Exception("Failed to update processing status in DynamoDB")
+    else:
+        error_message = f"Failed to process NYC taxi data: {response_payload}"
+        notify("NYC Taxi Data Processing Failed", error_message)
+        raise Exception(error_message)
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Union[int, str]]:
     """
     Orchestrate fetching of new NYC taxi data.
@@ -130,37 +335,21 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Union[int,
             notify("NYC Taxi Data Processing Skip", message)
             return {"statusCode": 200, "body": json.dumps(message)}
 
-        # Check if we've already processed this month
-        last_processed = get_last_processed_date(os.environ.get("DYNAMODB_TABLE_NAME", "nyc-taxi-processing"))
-        if last_processed and last_processed >= year_month:
-            message = f"Data for {year_month} has already been processed"
+        # Skip months another run is already processing
+        table_name = os.environ.get("DYNAMODB_TABLE_NAME", "nyc-taxi-processing")
+        owner = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+        if not acquire_lease(table_name, DATASET, year_month, owner):
+            message = f"Data for {year_month} is already being processed by another run"
             notify("NYC Taxi Data Processing Skip", message)
             return {"statusCode": 200, "body": json.dumps(message)}
 
-        # Process the data
-        logger.info(f"Processing data for {year_month} from URL: {url}")
-        payload = {"url": url, "year_month": year_month}
-
-        lambda_client = boto3.client("lambda")
-        processor_response = lambda_client.invoke(
-            FunctionName=os.environ["PROCESSOR_FUNCTION_NAME"], InvocationType="RequestResponse", Payload=json.dumps(payload)
-        )
-
-        response_payload = json.loads(processor_response["Payload"].read())
-        logger.info(f"Processor response: {response_payload}")
-
-        if processor_response["StatusCode"] == 200 and response_payload.get("statusCode") == 200:
-            # Update the last processed date
-            if update_last_processed_date(os.environ.get("DYNAMODB_TABLE_NAME", "nyc-taxi-processing"), year_month):
-                message = f"Successfully processed NYC taxi data for {year_month}"
-                notify("NYC Taxi Data Processing Success", message)
-                return {"statusCode": 200, "body": json.dumps(message)}
-            else:
-                raise Exception("Failed to update processing status in DynamoDB")
-        else:
-            error_message = f"Failed to process NYC taxi data: {response_payload}"
-            notify("NYC Taxi Data Processing Failed", error_message)
-            raise Exception(error_message)
+        heartbeat = LeaseHeartbeat(table_name, DATASET, year_month, owner)
+        heartbeat.start()
+        try:
+            return process_month(table_name, url, year_month, heartbeat)
+        finally:
+            heartbeat.stop()
+            release_lease(table_name, DATASET, year_month, owner)
 
     except Exception as e:
         error_message = f"Error in NYC taxi data processing: {str(e)}"
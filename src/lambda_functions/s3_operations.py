@@ -1,13 +1,44 @@
 import json
+import os
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
+from urllib.parse import unquote_plus
 
 import boto3
 
+SQS_BATCH_SIZE = 10  # max messages per receive/delete call allowed by SQS
+
+
+def parse_s3_event_message(body: str) -> List[Dict[str, str]]:
+    """Extract object references from an S3 event message body
+
+    Args:
+        body (str): SQS message body, either an EventBridge "Object Created" event
+            or a native S3 event notification with "Records"
+
+    Returns:
+        list: dicts with bucket, key and etag for every object in the message
+    """
+    message = json.loads(body)
+    objects = []
+
+    if "detail" in message:
+        detail = message["detail"]
+        objects.append({"bucket": detail["bucket"]["name"], "key": detail["object"]["key"], "etag": detail["object"].get("etag", "")})
+
+    for record in message.get("Records", []):
+        s3_info = record["s3"]
+        objects.append(
+            {"bucket": s3_info["bucket"]["name"], "key": unquote_plus(s3_info["object"]["key"]), "etag": s3_info["object"].get("eTag", "")}
+        )
+
+    return objects
+
 
 class S3FileProcessor:
     def __init__(self):
         self.s3 = boto3.client("s3")
+        self.sqs = boto3.client("sqs")
         self.cloudwatch = boto3.client("cloudwatch")
 
     def get_unprocessed_files(self, bucket: str, prefix: str) -> List[str]:
@@ -37,6 +68,78 @@ class S3FileProcessor:
 
         return unprocessed_files
 
+    def get_queued_files(self, bucket: str, prefix: str, queue_url: str, max_messages: int = 1000) -> Dict[str, List[str]]:
+        """Drain new-object events from the SQS queue in batches
+
+        Only objects referenced by queued events are inspected, so the cost scales with
+        new files rather than with everything under the prefix. Events are deduplicated on
+        object key + ETag, and objects already tagged as processed with the same ETag are skipped.
+        Messages are not deleted here; call acknowledge_queued once the files are processed.
+
+        Args:
+            bucket (str): source S3 bucket name
+            prefix (str): S3 prefix to filter files
+            queue_url (str): URL of the SQS queue receiving S3 events
+            max_messages (int): upper bound of messages drained per call (default: 1000)
+
+        Returns:
+            dict: unprocessed file keys and receipt handles of the drained messages
+        """
+        seen = set()
+        unprocessed_files = []
+        receipt_handles = []
+
+        while len(receipt_handles) < max_messages:
+            batch_size = min(SQS_BATCH_SIZE, max_messages - len(receipt_handles))
+            response = self.sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=batch_size, WaitTimeSeconds=1)
+            messages = response.get("Messages", [])
+            if not messages:
+                break
+
+            for message in messages:
+                receipt_handles.append(message["ReceiptHandle"])
+                for obj in parse_s3_event_message(message["Body"]):
+                    etag = obj["etag"].strip('"')
+                    if obj["bucket"] != bucket or not obj["key"].startswith(prefix) or (obj["key"], etag) in seen:
+                        continue
+                    seen.add((obj["key"], etag))
+
+                    try:
+                        response = self.s3.get_object_tagging(Bucket=bucket, Key=obj["key"])
+                    except self.s3.exceptions.NoSuchKey:
+                        continue
+                    tags = {tag["Key"]: tag["Value"] for tag in response.get("TagSet", [])}
+
+                    if tags.get("ProcessingStatus") == "Processed" and tags.get("ProcessedETag") == etag:
+                        continue
+                    if obj["key"] not in unprocessed_files:
+                        unprocessed_files.append(obj["key"])
+
+        return {"unprocessed_files": unprocessed_files, "receipt_handles": receipt_handles}
+
+    def acknowledge_queued(self, queue_url: str, receipt_handles: List[str]) -> None:
+        """Delete drained messages from the SQS queue
+
+        Args:
+            queue_url (str): URL of the SQS queue receiving S3 events
+            receipt_handles (list): receipt handles returned by get_queued_files
+
+        Returns:
+            None: removes messages from the queue
+
+        Raises:
+            Exception: if some messages could not be deleted, e.g. stale handles after the
+                visibility timeout; those messages are delivered again
+        """
+        failed = []
+        for start in range(0, len(receipt_handles), SQS_BATCH_SIZE):
+            entries = [{"Id": str(i), "ReceiptHandle": handle} for i, handle in enumerate(receipt_handles[start : start + SQS_BATCH_SIZE])]
+            response = self.sqs.delete_message_batch(QueueUrl=queue_url, Entries=entries)
+            failed += [f"{failure['Code']}: {failure.get('Message', '')}" for failure in response.get("Failed", [])]
+
+        if failed:
+            raise Exception(f"Failed to delete {len(failed)} of {len(receipt_handles)} messages ({failed[0]})")
+
     def mark_as_processed(self, bucket: str, key: str, status: str = "Processed", error: Optional[str] = None) -> None:
         """Mark S3 file with processing status via tags
 
@@ -49,7 +152,12 @@ class S3FileProcessor:
         Returns:
             None: updates S3 object tags
         """
-        tags = [{"Key": "ProcessingStatus", "Value": status}, {"Key": "ProcessedDate", "Value": datetime.now().isoformat()}]
+        etag = self.s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+        tags = [
+            {"Key": "ProcessingStatus", "Value": status},
+            {"Key": "ProcessedDate", "Value": datetime.now().isoformat()},
+            {"Key": "ProcessedETag", "Value": etag},
+        ]
         if error:
             tags.append({"Key": "Error", "Value": str(error)[:250]})
 
@@ -77,10 +185,12 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Union[int,
 
     Args:
         event (dict): Lambda event with action and file details
-            action (str): operation to perform (get_unprocessed/mark_processed/archive)
+            action (str): operation to perform (get_unprocessed/get_queued/ack_queued/mark_processed/archive)
             bucket (str): S3 bucket name
             key (str): S3 object key (for mark_processed/archive)
-            prefix (str): S3 prefix (for get_unprocessed)
+            prefix (str): S3 prefix (for get_unprocessed/get_queued)
+            queue_url (str): SQS queue URL (for get_queued/ack_queued, default: QUEUE_URL env)
+            receipt_handles (list): drained message handles (for ack_queued)
         context (object): Lambda context object
 
     Returns:
@@ -99,6 +209,19 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Union[int,
             files = processor.get_unprocessed_files(bucket, prefix)
             return {"statusCode": 200, "body": {"unprocessed_files": files}}
 
+        elif action == "get_queued":
+            prefix = event["prefix"]
+            queue_url = event.get("queue_url", os.environ.get("QUEUE_URL"))
+            max_messages = event.get("max_messages", 1000)
+            queued = processor.get_queued_files(bucket, prefix, queue_url, max_messages)
+            return {"statusCode": 200, "body": queued}
+
+        elif action == "ack_queued":
+            queue_url = event.get("queue_url", os.environ.get("QUEUE_URL"))
+            receipt_handles = event["receipt_handles"]
+            processor.acknowledge_queued(queue_url, receipt_handles)
+            return {"statusCode": 200, "body": f"Acknowledged {len(receipt_handles)} messages"}
+
         elif action == "mark_processed":
             key = event["key"]
             status = event.get("status", "Processed")
@@ -0,0 +1,364 @@
+import operator
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+COMPARISONS = {"=": operator.eq, "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+# A filter is a (column, op, value) tuple, all filters of a query are combined with AND
+Filter = Tuple[str, str, Any]
+
+
+def parse_partition_value(value: str) -> Any:
+    """Convert a hive partition directory value to a Python scalar
+
+    Args:
+        value (str): raw value from a `column=value` path segment
+
+    Returns:
+        Any: int or float if the value round trips, str otherwise, None for the hive default partition
+    """
+    if value == HIVE_DEFAULT_PARTITION:
+        return None
+    for cast in (int, float):
+        try:
+            parsed = cast(value)
+        except ValueError:
+            continue
+        # Only convert values that round trip, zero padded codes such as 007 stay strings
+        if str(parsed) == value:
+            return parsed
+    return value
+
+
+def cast_literal(value: Any, arrow_type: pa.DataType) -> Any:
+    """Convert a filter literal to a scalar of a file column's type
+
+    Arrow does not compare e.g. an int64 literal with a decimal(10,2) column, so literals are
+    cast to the column type. A literal that does not fit exactly, e.g. 10.125 for a
+    decimal(10,2) or 1000 for an int8 column, keeps its own type and is still compared exactly.
+
+    Args:
+        value (Any): filter literal
+        arrow_type (DataType): type of the column in the file
+
+    Returns:
+        Scalar: literal as an Arrow scalar, None stays None
+    """
+    if value is None or isinstance(value, pa.Scalar):
+        return value
+    if pa.types.is_decimal(arrow_type) and isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = Decimal(str(value))
+    try:
+        return pa.scalar(value, arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.scalar(value)
+
+
+def cast_filters(filters: List[Filter], schema: pa.Schema) -> List[Filter]:
+    """Cast the literals of filters on file columns to the column types
+
+    Args:
+        filters (list): (column, op, value) filters
+        schema (Schema): Arrow schema of the file, filters on other columns are kept as given
+
+    Returns:
+        list: filters with Arrow scalar literals (a list of scalars for in/not in)
+    """
+    cast = []
+    for column, op, target in filters:
+        if column in schema.names:
+            arrow_type = schema.field(column).type
+            target = [cast_literal(value, arrow_type) for value in target] if op in ("in", "not in") else cast_literal(target, arrow_type)
+        cast.append((column, op, target))
+    return cast
+
+
+def as_python(value: Any) -> Any:
+    """Return the Python value of an Arrow scalar, other values unchanged"""
+    return value.as_py() if isinstance(value, pa.Scalar) else value
+
+
+def matches_filter(value: Any, op: str, target: Any) -> bool:
+    """Evaluate a filter against a single known value
+
+    Args:
+        value (Any): column value, e.g. a partition value
+        op (str): comparison operator (=, ==, !=, <, <=, >, >=, in, not in)
+        target (Any): value (or collection for in/not in) to compare against
+
+    Returns:
+        bool: True if the value satisfies the filter or cannot be compared
+    """
+    if value is None:
+        return op == "not in" and None not in target
+    try:
+        if op == "in":
+            return value in target
+        if op == "not in":
+            return value not in target
+        return COMPARISONS[op](value, target)
+    except TypeError:
+        return True
+
+
+def stats_may_match(minimum: Any, maximum: Any, op: str, target: Any) -> bool:
+    """Decide from min/max statistics whether any value in a row group can satisfy a filter
+
+    Args:
+        minimum (Any): smallest non-null value in the row group
+        maximum (Any): largest non-null value in the row group
+        op (str): comparison operator (=, ==, !=, <, <=, >, >=, in, not in)
+        target (Any): value (or collection for in/not in) to compare against
+
+    Returns:
+        bool: False only if no value in [minimum, maximum] can satisfy the filter
+    """
+    try:
+        if op in ("=", "=="):
+            return minimum <= target <= maximum
+        if op == "!=":
+            return not minimum == maximum == target
+        if op == "<":
+            return minimum < target
+        if op == "<=":
+            return minimum <= target
+        if op == ">":
+            return maximum > target
+        if op == ">=":
+            return maximum >= target
+        if op == "in":
+            return any(minimum <= value <= maximum for value in target)
+        if op == "not in":
+            return not (minimum == maximum and minimum in target)
+    except TypeError:
+        return True
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def filter_expression(filters: List[Filter], schema: Optional[pa.Schema] = None) -> Optional[pc.Expression]:
+    """Build the Arrow expression applying all filters row by row
+
+    Args:
+        filters (list): (column, op, value) filters combined with AND
+        schema (Schema): file schema the literals are cast to (default: None, literals as given)
+
+    Returns:
+        Expression: combined expression or None if there are no filters
+    """
+    if schema is not None:
+        filters = cast_filters(filters, schema)
+    expression = None
+    for column, op, target in filters:
+        field = pc.field(column)
+        if op == "in":
+            condition = field.isin([as_python(value) for value in target])
+        elif op == "not in":
+            condition = ~field.isin([as_python(value) for value in target])
+        else:
+            condition = COMPARISONS[op](field, target)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+class FooterCache:
+    """LRU cache of parquet footers keyed by file path, size and modification time"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, int, Any], pq.FileMetaData]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, filesystem: pafs.FileSystem, file_info: pafs.FileInfo) -> pq.FileMetaData:
+        """Return the footer of a parquet file, reading it only on a cache miss
+
+        Args:
+            filesystem (FileSystem): filesystem holding the file
+            file_info (FileInfo): listing entry of the file
+
+        Returns:
+            FileMetaData: parsed parquet footer
+        """
+        key = (file_info.path, file_info.size, file_info.mtime_ns)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        with filesystem.open_input_file(file_info.path) as source:
+            metadata = pq.read_metadata(source)
+        self.entries[key] = metadata
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return metadata
+
+
+@dataclass
+class ScanStats:
+    """Pruning counters of the last query"""
+
+    partitions_pruned: int = 0
+    files_scanned: int = 0
+    row_groups_total: int = 0
+    row_groups_read: int = 0
+    bytes_read: int = 0
+
+
+class SilverQuery:
+    """Query the hive partitioned silver layout written by bronze_to_silver
+
+    Partition directories are pruned from their `column=value` names, row groups from the
+    min/max statistics of cached footers, and the remaining rows are filtered exactly.
+    """
+
+    def __init__(self, root: str, filesystem: Optional[pafs.FileSystem] = None, footer_cache: Optional[FooterCache] = None):
+        """
+        Args:
+            root (str): silver location, e.g. s3://bucket/cleaned/ or a local path
+            filesystem (FileSystem): filesystem for root, inferred from the URI if None (default: None)
+            footer_cache (FooterCache): footer cache shared between queries (default: new 256 entry cache)
+        """
+        if filesystem is None:
+            filesystem, root = pafs.FileSystem.from_uri(root)
+        self.filesystem = filesystem
+        self.root = root.rstrip("/")
+        self.footer_cache = footer_cache or FooterCache()
+        self.last_scan = ScanStats()
+
+    def list_files(self, filters: List[Filter]) -> List[Tuple[pafs.FileInfo, Dict[str, Any]]]:
+        """List parquet files whose partition values can satisfy the filters
+
+        Only directories of matching partitions are listed, so pruned partitions cost nothing.
+
+        Args:
+            filters (list): (column, op, value) filters combined with AND
+
+        Returns:
+            list: (file info, partition values) pairs
+        """
+        files = []
+        pending = [(self.root, {})]
+        while pending:
+            directory, partitions = pending.pop()
+            for info in self.filesystem.get_file_info(pafs.FileSelector(directory)):
+                name = info.base_name
+                if info.type == pafs.FileType.Directory and "=" in name:
+                    column, raw_value = name.split("=", 1)
+                    value = parse_partition_value(raw_value)
+                    if all(matches_filter(value, op, target) for filter_column, op, target in filters if filter_column == column):
+                        pending.append((info.path, {**partitions, column: value}))
+                    else:
+                        self.last_scan.partitions_pruned += 1
+                elif info.type == pafs.FileType.File and not name.startswith(("_", ".")):
+                    files.append((info, partitions))
+        return sorted(files, key=lambda item: item[0].path)
+
+    def select_row_groups(self, metadata: pq.FileMetaData, filters: List[Filter]) -> List[int]:
+        """Select row groups whose column statistics can satisfy the filters
+
+        Args:
+            metadata (FileMetaData): parquet footer of the file
+            filters (list): (column, op, value) filters on file columns, literals are cast to the column types
+
+        Returns:
+            list: indexes of row groups that must be read
+        """
+        filters = [
+            (column, op, [as_python(value) for value in target] if op in ("in", "not in") else as_python(target))
+            for column, op, target in cast_filters(filters, metadata.schema.to_arrow_schema())
+        ]
+        selected = []
+        for index in range(metadata.num_row_groups):
+            row_group = metadata.row_group(index)
+            columns = {row_group.column(i).path_in_schema: row_group.column(i) for i in range(row_group.num_columns)}
+            keep = True
+            for column, op, target in filters:
+                chunk = columns.get(column)
+                if chunk is None or not chunk.is_stats_set:
+                    continue
+                statistics = chunk.statistics
+                if statistics.null_count == row_group.num_rows and op != "not in":
+                    keep = False
+                elif statistics.has_min_max and not stats_may_match(statistics.min, statistics.max, op, target):
+                    keep = False
+                if not keep:
+                    break
+            if keep:
+                selected.append(index)
+        return selected
+
+    def to_batches(
+        self, columns: Optional[List[str]] = None, filters: Optional[List[Filter]] = None, batch_size: int = 65536
+    ) -> Iterator[pa.RecordBatch]:
+        """Stream matching rows as record batches
+
+        Args:
+            columns (list): columns to return, all columns if None (default: None)
+            filters (list): (column, op, value) filters combined with AND (default: None)
+            batch_size (int): maximum rows per batch read from a file (default: 65536)
+
+        Yields:
+            RecordBatch: matching rows restricted to the requested columns
+        """
+        filters = filters or []
+        self.last_scan = ScanStats()
+
+        for file_info, partitions in self.list_files(filters):
+            metadata = self.footer_cache.get(self.filesystem, file_info)
+            file_columns = metadata.schema.names
+            file_filters = [item for item in filters if item[0] in file_columns]
+            row_groups = self.select_row_groups(metadata, file_filters)
+
+            self.last_scan.files_scanned += 1
+            self.last_scan.row_groups_total += metadata.num_row_groups
+            self.last_scan.row_groups_read += len(row_groups)
+            if not row_groups:
+                continue
+
+            expression = filter_expression(filters, metadata.schema.to_arrow_schema())
+            wanted = file_columns if columns is None else columns
+            read_columns = [name for name in file_columns if name in wanted or name in {item[0] for item in file_filters}]
+            for index in row_groups:
+                row_group = metadata.row_group(index)
+                self.last_scan.bytes_read += sum(
+                    row_group.column(i).total_compressed_size
+                    for i in range(row_group.num_columns)
+                    if row_group.column(i).path_in_schema in read_columns
+                )
+
+            with self.filesystem.open_input_file(file_info.path) as source:
+                parquet_file = pq.ParquetFile(source, metadata=metadata)
+                for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=read_columns):
+                    table = pa.Table.from_batches([batch])
+                    for column, value in partitions.items():
+                        if column not in table.column_names:
+                            table = table.append_column(column, pa.repeat(value, table.num_rows))
+                    if expression is not None:
+                        table = table.filter(expression)
+                    if table.num_rows:
+                        yield from (table.select(columns) if columns else table).to_batches()
+
+    def to_table(self, columns: Optional[List[str]] = None, filters: Optional[List[Filter]] = None) -> pa.Table:
+        """Read matching rows into a single Arrow table
+
+        Args:
+            columns (list): columns to return, all columns if None (default: None)
+            filters (list): (column, op, value) filters combined with AND (default: None)
+
+        Returns:
+            Table: matching rows restricted to the requested columns
+        """
+        batches = list(self.to_batches(columns, filters))
+        if not batches:
+            return pa.table({column: pa.array([]) for column in columns or []})
+        return pa.concat_tables([pa.Table.from_batches([batch]) for batch in batches], promote_options="permissive")
@@ -37,6 +37,11 @@ resource "aws_s3_bucket_lifecycle_configuration" "bucket_lifecycle" {
     id     = "transition_and_expiration"
     status = "Enabled"
 
+    # Keep reference data and row group fingerprints outside of the raw data expiry
+    filter {
+      prefix = "nyc_taxi/"
+    }
+
     transition {
       days          = 30
       storage_class = "STANDARD_IA"
@@ -114,6 +119,15 @@ resource "aws_lambda_layer_version" "requests_layer" {
   compatible_runtimes = ["python3.10"]
 }
 
+# The runtime's bundled SDK may predate ChecksumType=FULL_OBJECT (botocore 1.36)
+resource "aws_lambda_layer_version" "boto3_layer" {
+  filename            = "../dist/lambda_layer_boto3.zip"
+  layer_name          = "boto3_layer"
+  description         = "Layer for boto3 1.36+"
+  compatible_runtimes = ["python3.10"]
+  source_code_hash    = filebase64sha256("../dist/lambda_layer_boto3.zip")
+}
+
 # ------------------------------
 # Lambda Function Definition
 # ------------------------------
@@ -130,7 +144,8 @@ resource "aws_lambda_function" "nytaxi_data_downloader" {
   source_code_hash = filebase64sha256("../dist/data_downloader.zip")
 
   layers = [
-    aws_lambda_layer_version.requests_layer.arn
+    aws_lambda_layer_version.requests_layer.arn,
+    aws_lambda_layer_version.boto3_layer.arn
   ]
 
   environment {
@@ -146,7 +161,8 @@ resource "aws_lambda_function" "nytaxi_fetch_raw_data" {
   role          = aws_iam_role.lambda_role.arn
   handler       = "fetch_raw_data.lambda_handler"
   runtime       = "python3.10"
-  timeout       = 60
+  # Outlive the synchronous downloader call (300s) so the lease is released by this run
+  timeout       = 330
   memory_size   = 128
 
   s3_bucket        = aws_s3_bucket.lambda_code.id
@@ -184,6 +200,7 @@ resource "aws_lambda_function" "s3_operations" {
     variables = {
       REGION                  = var.region
       NOTIFICATION_TOPIC_ARN  = aws_sns_topic.processing_notifications.arn
+      QUEUE_URL               = aws_sqs_queue.bronze_object_events.url
     }
   }
 }
@@ -260,6 +277,12 @@ resource "aws_dynamodb_table" "nyc_taxi_processing" {
     name = "id"
     type = "S"
   }
+
+  # Clean up expired processing leases
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
 }
 resource "aws_iam_role_policy" "lambda_dynamodb" {
   role = aws_iam_role.lambda_role.id
@@ -272,7 +295,8 @@ resource "aws_iam_role_policy" "lambda_dynamodb" {
         Action = [
           "dynamodb:GetItem",
           "dynamodb:PutItem",
-          "dynamodb:UpdateItem"
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem"
         ]
         Resource = aws_dynamodb_table.nyc_taxi_processing.arn
       }
@@ -490,6 +514,13 @@ resource "aws_s3_object" "bronze_to_silver_script" {
   etag   = filemd5("../src/glue_scripts/bronze_to_silver.py")
 }
 
+resource "aws_s3_object" "bronze_row_groups_module" {
+  bucket = aws_s3_bucket.lambda_code.id
+  key    = "bronze_row_groups.py"
+  source = "../src/glue_scripts/bronze_row_groups.py"
+  etag   = filemd5("../src/glue_scripts/bronze_row_groups.py")
+}
+
 resource "aws_glue_job" "bronze_to_silver" {
   name              = "nytaxi_bronze_to_silver"
   role_arn          = aws_iam_role.glue_role.arn
@@ -507,9 +538,13 @@ resource "aws_glue_job" "bronze_to_silver" {
     "--continuous-log-logGroup"          = "/aws-glue/jobs/bronze_to_silver"
     "--enable-continuous-cloudwatch-log" = "true"
     "--enable-metrics"                   = "true"
+    "--extra-py-files"                   = "s3://${aws_s3_bucket.lambda_code.id}/${aws_s3_object.bronze_row_groups_module.key}"
     "--source_bucket"                    = aws_s3_bucket.my_bucket.id
     "--target_bucket"                    = aws_s3_bucket.silver_bucket.id
     "--lambda_function_name"                    = aws_lambda_function.s3_operations.function_name
+    "--queue_url"                        = aws_sqs_queue.bronze_object_events.url
+    "--full_listing"                     = "false"
+    "--zone_lookup_key"                  = "reference/taxi_zone_lookup.csv"
   }
 }
 
@@ -541,6 +576,66 @@ resource "aws_cloudwatch_event_rule" "s3_trigger" {
   })
 }
 
+# ----------------------------------
+# SQS queue buffering new bronze objects
+# ---------------------------------
+resource "aws_sqs_queue" "bronze_object_events" {
+  name                       = "nytaxi-bronze-object-events"
+  # Messages stay invisible while the Glue job processes a drained batch
+  visibility_timeout_seconds = 7200
+  message_retention_seconds  = 1209600
+}
+
+resource "aws_cloudwatch_event_rule" "bronze_object_created" {
+  name        = "nytaxi-bronze-object-created"
+  description = "Buffer new bronze objects for incremental processing"
+
+  event_pattern = jsonencode({
+    source      = ["aws.s3"]
+    detail-type = ["Object Created"]
+    detail = {
+      bucket = {
+        name = [aws_s3_bucket.my_bucket.id]
+      }
+      object = {
+        key = [{
+          prefix = "nyc_taxi/"
+        }]
+      }
+    }
+  })
+}
+
+resource "aws_cloudwatch_event_target" "bronze_object_queue" {
+  rule      = aws_cloudwatch_event_rule.bronze_object_created.name
+  target_id = "BufferBronzeObjects"
+  arn       = aws_sqs_queue.bronze_object_events.arn
+}
+
+resource "aws_sqs_queue_policy" "bronze_object_events" {
+  queue_url = aws_sqs_queue.bronze_object_events.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "AllowEventBridgeToSend"
+        Effect = "Allow"
+        Principal = {
+          Service = "events.amazonaws.com"
+        }
+        Action   = "sqs:SendMessage"
+        Resource = aws_sqs_queue.bronze_object_events.arn
+        Condition = {
+          ArnEquals = {
+            "aws:SourceArn" = aws_cloudwatch_event_rule.bronze_object_created.arn
+          }
+        }
+      }
+    ]
+  })
+}
+
 # ----------------------------------
 # Glue Workflow
 # ---------------------------------
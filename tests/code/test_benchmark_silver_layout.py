@@ -0,0 +1,15 @@
+from scripts.benchmark_silver_layout import benchmark, generate_trips
+
+
+def test_generate_trips():
+    table = generate_trips(1000)
+    assert table.num_rows == 1000
+    assert set(table["payment_type"].to_pylist()) <= {1, 2}
+
+
+def test_sorted_layout_reads_less(tmp_path):
+    before, after = benchmark(rows=50_000, row_group_size=2_000, repeats=1, output_dir=str(tmp_path))
+
+    assert before["rows"] == after["rows"]
+    assert after["row_groups_read"] < before["row_groups_read"]
+    assert after["bytes_read"] < before["bytes_read"]
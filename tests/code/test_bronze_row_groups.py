@@ -0,0 +1,135 @@
+import re
+
+import boto3
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+import pytest
+from moto import mock_aws
+
+from src.glue_scripts.bronze_row_groups import (
+    SOURCE_MONTH_PATTERN,
+    SOURCE_ROW_GROUP_PATTERN,
+    fingerprint_row_groups,
+    load_fingerprints,
+    plan_row_group_changes,
+    save_fingerprints,
+    stage_row_groups,
+    unchanged_row_groups,
+)
+
+BUCKET = "bronze-bucket"
+
+
+def _row_group(start: int) -> pa.Table:
+    return pa.table({"PULocationID": pa.array(range(start, start + 10), pa.int64()), "fare_amount": pa.array([float(start)] * 10)})
+
+
+def _write_bronze(filesystem: pafs.FileSystem, key: str, row_groups: list) -> None:
+    filesystem.create_dir(f"{BUCKET}/{key.rsplit('/', 1)[0]}")
+    pq.write_table(pa.concat_tables(row_groups), f"{BUCKET}/{key}", filesystem=filesystem, row_group_size=10)
+
+
+@pytest.fixture
+def bronze(aws_credentials, tmp_path):
+    """Local parquet filesystem for the bronze files, moto S3 for the fingerprint json"""
+    with mock_aws():
+        boto3.client("s3").create_bucket(Bucket=BUCKET, CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+        yield pafs.SubTreeFileSystem(str(tmp_path), pafs.LocalFileSystem())
+
+
+def test_fingerprint_ids_are_never_numeric(bronze):
+    _write_bronze(bronze, "nyc_taxi/yellow_taxi_2024-01_a.parquet", [_row_group(0), _row_group(10)])
+
+    fingerprints = fingerprint_row_groups(BUCKET, "nyc_taxi/yellow_taxi_2024-01_a.parquet", bronze)
+
+    assert [fingerprint["index"] for fingerprint in fingerprints] == [0, 1]
+    for fingerprint in fingerprints:
+        assert fingerprint["id"].startswith("rg")
+        assert re.search(SOURCE_ROW_GROUP_PATTERN, f"_staging/x/source_rg={fingerprint['id']}.parquet").group(1) == fingerprint["id"]
+
+
+def test_plan_row_group_changes(bronze):
+    first, second = "nyc_taxi/yellow_taxi_2024-01_a.parquet", "nyc_taxi/yellow_taxi_2024-01_b.parquet"
+    unchanged, changed, moved, removed = _row_group(0), _row_group(10), _row_group(20), _row_group(30)
+    _write_bronze(bronze, first, [unchanged, changed, moved, removed])
+
+    (plan,) = plan_row_group_changes(BUCKET, [first], bronze)
+    assert len(plan["changed"]) == 4 and plan["removed"] == []
+    save_fingerprints(BUCKET, plan["source_month"], plan["key"], plan["fingerprints"])
+    previous = {fingerprint["index"]: fingerprint["id"] for fingerprint in load_fingerprints(BUCKET, "2024-01")}
+
+    republished = _row_group(10).set_column(1, "fare_amount", pa.array([99.0] * 10))
+    _write_bronze(bronze, second, [unchanged, moved, republished])
+
+    # The earlier download of the same month is superseded by the later one
+    (plan,) = plan_row_group_changes(BUCKET, [second, first], bronze)
+    assert plan["key"] == second
+    assert plan["source_month"] == "2024-01"
+    assert [(fingerprint["index"], fingerprint["id"]) for fingerprint in plan["changed"]] == [(2, plan["fingerprints"][2]["id"])]
+    assert plan["fingerprints"][0]["id"] == previous[0]
+    assert plan["fingerprints"][1]["id"] == previous[2]
+    assert plan["removed"] == sorted([previous[1], previous[3]])
+
+
+def test_plan_row_group_changes_skips_unknown_keys(bronze):
+    key = "nyc_taxi/yellow_taxi_2024-01_a.parquet"
+    _write_bronze(bronze, key, [_row_group(0)])
+
+    plans = plan_row_group_changes(BUCKET, ["nyc_taxi/other.parquet", key], bronze)
+
+    assert [plan["key"] for plan in plans] == [key]
+
+
+def _trip_hashes(table: pa.Table) -> pa.Array:
+    return pa.array([hash(row) for row in zip(*table.to_pydict().values())], pa.int64())
+
+
+def test_edited_row_group_keeps_all_trips(bronze, tmp_path):
+    first, second = "nyc_taxi/yellow_taxi_2024-01_a.parquet", "nyc_taxi/yellow_taxi_2024-01_b.parquet"
+    kept, edited = _row_group(0), _row_group(10)
+    _write_bronze(bronze, first, [kept, edited])
+    (plan,) = plan_row_group_changes(BUCKET, [first], bronze)
+    save_fingerprints(BUCKET, plan["source_month"], plan["key"], plan["fingerprints"])
+
+    # Trip hash set written by the first run, partitioned like record_trip_hashes
+    hash_path = tmp_path / "trip_hashes"
+    for fingerprint, table in zip(plan["fingerprints"], (kept, edited)):
+        partition = hash_path / "source_month=2024-01" / f"source_rg={fingerprint['id']}"
+        partition.mkdir(parents=True)
+        pq.write_table(pa.table({"row_hash": _trip_hashes(table)}), partition / "part-0.parquet")
+
+    # TLC corrects two fares of the second row group
+    corrected = edited.set_column(1, "fare_amount", pa.array([10.0] * 8 + [11.5, 12.5]))
+    _write_bronze(bronze, second, [kept, corrected])
+    (plan,) = plan_row_group_changes(BUCKET, [second], bronze)
+    unchanged = unchanged_row_groups([plan])
+
+    # Anti-join of deduplicate_trips: only hashes of unchanged row groups are matched
+    hash_set = ds.dataset(hash_path, partitioning="hive")
+    seen = hash_set.to_table(
+        filter=pc.field("source_month").isin(list(unchanged)) & pc.field("source_rg").isin(unchanged["2024-01"]), columns=["row_hash"]
+    )
+    new_hashes = _trip_hashes(corrected)
+    written = corrected.filter(pc.invert(pc.is_in(new_hashes, seen["row_hash"])))
+
+    assert unchanged == {"2024-01": [plan["fingerprints"][0]["id"]]}
+    assert written.num_rows == corrected.num_rows
+
+
+def test_stage_row_groups(bronze):
+    key = "nyc_taxi/yellow_taxi_2024-01_a.parquet"
+    _write_bronze(bronze, key, [_row_group(0), _row_group(10), _row_group(20)])
+    fingerprints = fingerprint_row_groups(BUCKET, key, bronze)
+    # S3 has no directories, locally the staging directory must exist
+    bronze.create_dir(f"{BUCKET}/_staging/yellow_taxi_2024-01_a")
+
+    staged = stage_row_groups(BUCKET, key, [fingerprints[2], fingerprints[0]], bronze)
+
+    assert staged == [f"_staging/yellow_taxi_2024-01_a/source_rg={fingerprints[index]['id']}.parquet" for index in (2, 0)]
+    assert re.search(SOURCE_MONTH_PATTERN, staged[0]).group(1) == "2024-01"
+    for staged_key, start in zip(staged, (20, 0)):
+        table = pq.read_table(f"{BUCKET}/{staged_key}", filesystem=bronze)
+        assert table.equals(_row_group(start))
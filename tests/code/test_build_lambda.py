@@ -45,6 +45,15 @@ def test_create_single_layer_package_custom_version(temp_dir):
         assert "3.9" in call_args
 
 
+def test_create_single_layer_package_pins_boto3(temp_dir):
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = Mock(returncode=0)
+        create_single_layer_package("boto3")
+
+        assert "boto3>=1.36.0" in mock_run.call_args[0][0]
+        assert os.path.exists("dist/lambda_layer_boto3.zip")
+
+
 def test_create_lambda_package(temp_dir):
     # Create a temporary test file structure
     test_src_dir = Path(temp_dir) / "test_src" / "lambda_functions"
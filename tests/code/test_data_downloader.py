@@ -1,4 +1,7 @@
-from unittest.mock import MagicMock, patch
+import base64
+import io
+import zlib
+from unittest.mock import MagicMock, PropertyMock, patch
 
 import boto3
 import pytest
@@ -6,6 +9,10 @@ from botocore.exceptions import ClientError
 from moto import mock_aws
 
 from src.lambda_functions.data_downloader import (
+    READ_CHUNK_SIZE,
+    ChecksummingStream,
+    TransferDeadlineExceeded,
+    TransferVerificationError,
     download_and_upload_to_s3,
     lambda_handler,
 )
@@ -20,11 +27,13 @@ def mock_env():
 @mock_aws
 def test_download_and_upload_to_s3():
     mock_response = MagicMock()
-    mock_response.raw = MagicMock()
+    mock_response.raw = io.BytesIO(b"data")
+    mock_response.headers = {"Content-Length": "4"}
     mock_response.raise_for_status.return_value = None
 
     with patch("requests.get", return_value=mock_response) as mock_get, patch("boto3.client") as mock_boto:
         mock_s3 = MagicMock()
+        mock_s3.head_object.return_value = {"ContentLength": 4, "ChecksumCRC32": "rfPzYw=="}
         mock_boto.return_value = mock_s3
 
         result = download_and_upload_to_s3("http://test.com/data.parquet", "test-bucket", "2024-01")
@@ -32,7 +41,9 @@ def test_download_and_upload_to_s3():
         assert "nyc_taxi/yellow_taxi_2024-01_" in result
         assert result.endswith(".parquet")
         mock_get.assert_called_once()
-        mock_s3.upload_fileobj.assert_called_once()
+        mock_s3.put_object.assert_called_once_with(
+            Bucket="test-bucket", Key=result, Body=b"data", ChecksumAlgorithm="CRC32", ChecksumCRC32="rfPzYw=="
+        )
 
 
 @mock_aws
@@ -46,3 +57,114 @@ def test_lambda_handler_success(mock_env):
         assert response["statusCode"] == 200
         assert response["body"]["bucket"] == "test-bucket"
         assert response["body"]["key"] == "test_key"
+
+
+def _streamed_response(data, content_length):
+    mock_response = MagicMock()
+    mock_response.raw = io.BytesIO(data)
+    mock_response.headers = {"Content-Length": str(content_length)}
+    mock_response.raise_for_status.return_value = None
+    return mock_response
+
+
+def test_checksumming_stream():
+    stream = ChecksummingStream(io.BytesIO(b"hello world"))
+
+    assert stream.read(5) + stream.read() == b"hello world"
+    assert stream.bytes_read == 11
+    assert stream.crc32_base64 == "DUoRhQ=="
+    assert stream.sha256.hexdigest() == "b94d27b9934d3e08a52e52d7da7dabfac484efe37a5380ee9088f7ace2efcde9"
+
+
+def test_checksumming_stream_checks_deadline_between_chunks():
+    context = MagicMock()
+    context.get_remaining_time_in_millis.side_effect = [60000, 60000, 1000]
+    stream = ChecksummingStream(io.BytesIO(b"x" * READ_CHUNK_SIZE * 3), context)
+
+    with pytest.raises(TransferDeadlineExceeded):
+        stream.read()
+    assert stream.bytes_read == READ_CHUNK_SIZE * 2
+
+
+@mock_aws
+def test_download_and_upload_to_s3_verifies_object(aws_credentials):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    data = b"PAR1" * 1000
+
+    with patch("requests.get", return_value=_streamed_response(data, len(data))):
+        key = download_and_upload_to_s3("http://test.com/data.parquet", "test-bucket", "2024-01")
+
+    head = s3.head_object(Bucket="test-bucket", Key=key, ChecksumMode="ENABLED")
+    assert head["ContentLength"] == len(data)
+    assert head["ChecksumCRC32"] == base64.b64encode(zlib.crc32(data).to_bytes(4, "big")).decode("ascii")
+
+
+@mock_aws
+def test_download_and_upload_to_s3_rejects_truncated_stream(aws_credentials):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+
+    with patch("requests.get", return_value=_streamed_response(b"PAR1", 8)):
+        with pytest.raises(TransferVerificationError):
+            download_and_upload_to_s3("http://test.com/data.parquet", "test-bucket", "2024-01")
+
+    assert "Contents" not in s3.list_objects_v2(Bucket="test-bucket")
+
+
+@mock_aws
+def test_download_and_upload_to_s3_aborts_near_deadline(aws_credentials):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 1000
+
+    with patch("requests.get", return_value=_streamed_response(b"PAR1", 4)):
+        with pytest.raises(TransferDeadlineExceeded):
+            download_and_upload_to_s3("http://test.com/data.parquet", "test-bucket", "2024-01", context)
+
+    assert "Contents" not in s3.list_objects_v2(Bucket="test-bucket")
+
+
+@mock_aws
+def test_download_and_upload_to_s3_sends_full_object_checksum(aws_credentials):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    data = b"PAR1" * (2 * 1024 * 1024) + b"tail"
+
+    with patch("src.lambda_functions.data_downloader.PART_SIZE", 5 * 1024 * 1024), patch(
+        "requests.get", return_value=_streamed_response(data, len(data))
+    ):
+        key = download_and_upload_to_s3("http://test.com/data.parquet", "test-bucket", "2024-01")
+
+    head = s3.head_object(Bucket="test-bucket", Key=key, ChecksumMode="ENABLED")
+    assert head["ContentLength"] == len(data)
+    assert head["ChecksumType"] == "FULL_OBJECT"
+    assert head["ChecksumCRC32"] == base64.b64encode(zlib.crc32(data).to_bytes(4, "big")).decode("ascii")
+
+
+@mock_aws
+def test_download_and_upload_to_s3_rejects_checksum_mismatch(aws_credentials):
+    s3 = boto3.client("s3")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    data = b"PAR1" * (2 * 1024 * 1024)
+
+    with patch("src.lambda_functions.data_downloader.PART_SIZE", 5 * 1024 * 1024), patch(
+        "requests.get", return_value=_streamed_response(data, len(data))
+    ), patch.object(ChecksummingStream, "crc32_base64", new_callable=PropertyMock, return_value="AAAAAA=="):
+        with pytest.raises(TransferVerificationError, match="CRC32 mismatch"):
+            download_and_upload_to_s3("http://test.com/data.parquet", "test-bucket", "2024-01")
+
+    assert "Contents" not in s3.list_objects_v2(Bucket="test-bucket")
+    assert "Uploads" not in s3.list_multipart_uploads(Bucket="test-bucket")
+
+
+def test_upload_rejected_by_s3_checksum_is_a_verification_error():
+    s3_client = MagicMock()
+    s3_client.put_object.side_effect = ClientError({"Error": {"Code": "BadDigest"}}, "PutObject")
+
+    with patch("requests.get", return_value=_streamed_response(b"data", 4)), patch("boto3.client", return_value=s3_client):
+        with pytest.raises(TransferVerificationError, match="rejected the CRC32"):
+            download_and_upload_to_s3("http://test.com/data.parquet", "test-bucket", "2024-01")
+
+    s3_client.delete_object.assert_called_once()
@@ -1,20 +1,44 @@
+import time
 from datetime import datetime
 from unittest.mock import MagicMock, patch
 
+import boto3
 import pytest
+from botocore.exceptions import ClientError
 from moto import mock_aws
 
 from src.lambda_functions.fetch_raw_data import (
-    get_monthly_url,
+    DATASET,
+    LeaseHeartbeat,
+    acquire_lease,
+    find_latest_available_data,
     lambda_handler,
     notify,
+    release_lease,
+    renew_lease,
 )
 
 
-def test_get_monthly_url():
-    with patch("src.lambda_functions.fetch_raw_data.datetime") as mock_datetime:
-        mock_datetime.now.return_value = datetime(2024, 2, 15)
-        url = get_monthly_url()
+@pytest.fixture
+def processing_table(aws_credentials):
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        dynamodb.create_table(
+            TableName="nyc-taxi-processing",
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield dynamodb.Table("nyc-taxi-processing")
+
+
+def test_find_latest_available_data():
+    with patch("src.lambda_functions.fetch_raw_data.datetime") as mock_datetime, patch(
+        "src.lambda_functions.fetch_raw_data.check_url_exists", return_value=True
+    ):
+        mock_datetime.now.return_value = datetime(2024, 3, 15)
+        url, year_month = find_latest_available_data()
+        assert year_month == "2024-01"
         assert "2024-01" in url
         assert url.endswith(".parquet")
 
@@ -31,19 +55,67 @@ def test_notify():
             mock_sns.publish.assert_called_once_with(TopicArn="test-arn", Subject="Test Subject", Message="Test Message")
 
 
-@mock_aws
-def test_lambda_handler():
+def test_acquire_lease_excludes_second_owner(processing_table):
+    assert acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "run-1")
+    assert not acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "run-2")
+    assert acquire_lease("nyc-taxi-processing", DATASET, "2024-02", "run-2")
+
+    release_lease("nyc-taxi-processing", DATASET, "2024-01", "run-2")
+    assert not acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "run-2")
+
+    release_lease("nyc-taxi-processing", DATASET, "2024-01", "run-1")
+    assert acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "run-2")
+
+
+def test_expired_lease_is_taken_over(processing_table):
+    assert acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "crashed-run", duration=-1)
+
+    assert acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "run-2")
+    assert not renew_lease("nyc-taxi-processing", DATASET, "2024-01", "crashed-run")
+
+    assert renew_lease("nyc-taxi-processing", DATASET, "2024-01", "run-2", duration=600)
+    item = processing_table.get_item(Key={"id": f"lease#{DATASET}#2024-01"})["Item"]
+    assert item["lease_owner"] == "run-2"
+    assert item["expires_at"] > time.time() + 500
+
+
+def test_renew_lease_retries_transient_errors(processing_table):
+    acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "run-1")
+    throttled = ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "UpdateItem")
+    table = MagicMock()
+    table.update_item.side_effect = [throttled, None]
+
+    with patch("boto3.resource") as mock_resource, patch("src.lambda_functions.fetch_raw_data.time.sleep"):
+        mock_resource.return_value.Table.return_value = table
+        assert renew_lease("nyc-taxi-processing", DATASET, "2024-01", "run-1")
+
+        table.update_item.side_effect = throttled
+        with pytest.raises(ClientError):
+            renew_lease("nyc-taxi-processing", DATASET, "2024-01", "run-1")
+
+
+def test_heartbeat_survives_transient_errors():
+    throttled = ClientError({"Error": {"Code": "ThrottlingException"}}, "UpdateItem")
+    with patch("src.lambda_functions.fetch_raw_data.renew_lease", side_effect=[throttled, throttled, False]) as mock_renew:
+        heartbeat = LeaseHeartbeat("nyc-taxi-processing", DATASET, "2024-01", "run-1", interval=0)
+        heartbeat.run()
+
+    assert mock_renew.call_count == 3
+    assert heartbeat.lost
+
+
+def test_lambda_handler(processing_table):
     mock_response = {"StatusCode": 200, "Payload": MagicMock()}
     mock_response["Payload"].read.return_value = b'{"statusCode": 200}'
 
     with patch("boto3.client") as mock_boto, patch("src.lambda_functions.fetch_raw_data.notify") as mock_notify, patch(
-        "src.lambda_functions.fetch_raw_data.get_monthly_url"
+        "src.lambda_functions.fetch_raw_data.find_latest_available_data"
     ) as mock_url:
 
         mock_lambda = MagicMock()
         mock_lambda.invoke.return_value = mock_response
         mock_boto.return_value = mock_lambda
-        mock_url.return_value = "http://test.com/data.parquet"
+        mock_url.return_value = ("http://test.com/data.parquet", "2024-01")
 
         with patch.dict("os.environ", {"PROCESSOR_FUNCTION_NAME": "test-function", "NOTIFICATION_TOPIC_ARN": "test-arn"}):
             response = lambda_handler({}, None)
@@ -51,3 +123,41 @@ def test_lambda_handler():
             assert response["statusCode"] == 200
             mock_notify.assert_called_once()
             mock_lambda.invoke.assert_called_once()
+            config = mock_boto.call_args.kwargs["config"]
+            assert config.read_timeout == 310
+            assert config.retries == {"max_attempts": 0}
+
+    assert processing_table.get_item(Key={"id": "last_processed"})["Item"]["year_month"] == "2024-01"
+    assert "Item" not in processing_table.get_item(Key={"id": f"lease#{DATASET}#2024-01"})
+
+
+def test_lambda_handler_skips_month_in_flight(processing_table):
+    acquire_lease("nyc-taxi-processing", DATASET, "2024-01", "other-run")
+
+    with patch("boto3.client") as mock_boto, patch("src.lambda_functions.fetch_raw_data.notify") as mock_notify, patch(
+        "src.lambda_functions.fetch_raw_data.find_latest_available_data", return_value=("http://test.com/data.parquet", "2024-01")
+    ):
+        response = lambda_handler({}, None)
+
+        assert response["statusCode"] == 200
+        assert "already being processed" in response["body"]
+        mock_notify.assert_called_once()
+        mock_boto.return_value.invoke.assert_not_called()
+
+
+def test_lambda_handler_keeps_status_when_lease_lost(processing_table):
+    mock_response = {"StatusCode": 200, "Payload": MagicMock()}
+    mock_response["Payload"].read.return_value = b'{"statusCode": 200}'
+
+    with patch("boto3.client") as mock_boto, patch("src.lambda_functions.fetch_raw_data.notify"), patch(
+        "src.lambda_functions.fetch_raw_data.find_latest_available_data", return_value=("http://test.com/data.parquet", "2024-01")
+    ), patch("src.lambda_functions.fetch_raw_data.LeaseHeartbeat") as mock_heartbeat:
+        mock_boto.return_value.invoke.return_value = mock_response
+        mock_heartbeat.return_value.lost = True
+
+        with patch.dict("os.environ", {"PROCESSOR_FUNCTION_NAME": "test-function", "NOTIFICATION_TOPIC_ARN": "test-arn"}):
+            response = lambda_handler({}, None)
+
+    assert response["statusCode"] == 500
+    assert "lease for 2024-01 was lost" in response["body"].lower()
+    assert "Item" not in processing_table.get_item(Key={"id": "last_processed"})
@@ -0,0 +1,35 @@
+import boto3
+from moto import mock_aws
+
+from scripts.migrate_silver_layout import migrate
+
+LEGACY_KEYS = [
+    "cleaned/payment_type=1/part-00000.snappy.parquet",
+    "_dedup/trip_hashes/source_month=2024-01/part-00000.snappy.parquet",
+]
+CURRENT_KEYS = [
+    "cleaned/_SUCCESS",
+    "cleaned/payment_type=1/source_month=2024-01/source_rg=rg0a1b/part-00000.snappy.parquet",
+    "_dedup/trip_hashes/source_month=2024-01/source_rg=rg0a1b/part-00000.snappy.parquet",
+]
+
+
+@mock_aws
+def test_migrate_removes_legacy_layout_and_resets_bronze(aws_credentials):
+    s3 = boto3.client("s3")
+    for bucket in ("silver-bucket", "bronze-bucket"):
+        s3.create_bucket(Bucket=bucket, CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    for key in LEGACY_KEYS + CURRENT_KEYS:
+        s3.put_object(Bucket="silver-bucket", Key=key, Body=b"data")
+    s3.put_object(Bucket="bronze-bucket", Key="nyc_taxi/yellow_taxi_2024-01_a.parquet", Body=b"data", Tagging="ProcessingStatus=Processed")
+    s3.put_object(Bucket="bronze-bucket", Key="_fingerprints/yellow_taxi_2024-01.json", Body=b"{}")
+
+    assert sorted(migrate("silver-bucket", "bronze-bucket", dry_run=True)) == sorted(LEGACY_KEYS)
+    assert s3.get_object_tagging(Bucket="bronze-bucket", Key="nyc_taxi/yellow_taxi_2024-01_a.parquet")["TagSet"]
+
+    migrate("silver-bucket", "bronze-bucket")
+
+    remaining = [obj["Key"] for obj in s3.list_objects_v2(Bucket="silver-bucket")["Contents"]]
+    assert sorted(remaining) == sorted(CURRENT_KEYS)
+    assert s3.get_object_tagging(Bucket="bronze-bucket", Key="nyc_taxi/yellow_taxi_2024-01_a.parquet")["TagSet"] == []
+    assert "Contents" not in s3.list_objects_v2(Bucket="bronze-bucket", Prefix="_fingerprints/")
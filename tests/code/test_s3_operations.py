@@ -1,9 +1,15 @@
+import json
 from unittest.mock import MagicMock, patch
 
+import boto3
 import pytest
 from moto import mock_aws
 
-from src.lambda_functions.s3_operations import S3FileProcessor, lambda_handler
+from src.lambda_functions.s3_operations import (
+    S3FileProcessor,
+    lambda_handler,
+    parse_s3_event_message,
+)
 
 
 @pytest.fixture
@@ -64,3 +70,94 @@ def test_lambda_handler_get_unprocessed():
 
         assert response["statusCode"] == 200
         assert len(response["body"]["unprocessed_files"]) == 2
+
+
+def _object_created_event(bucket, key, etag):
+    return json.dumps(
+        {"source": "aws.s3", "detail-type": "Object Created", "detail": {"bucket": {"name": bucket}, "object": {"key": key, "etag": etag}}}
+    )
+
+
+@mock_aws
+def test_get_queued_files_deduplicates_on_key_and_etag(aws_credentials):
+    s3 = boto3.client("s3")
+    sqs = boto3.client("sqs")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    queue_url = sqs.create_queue(QueueName="test-queue")["QueueUrl"]
+
+    etag = s3.put_object(Bucket="test-bucket", Key="nyc_taxi/file1.parquet", Body=b"data")["ETag"].strip('"')
+    s3.put_object(Bucket="test-bucket", Key="other/file2.parquet", Body=b"data")
+    for _ in range(3):
+        sqs.send_message(QueueUrl=queue_url, MessageBody=_object_created_event("test-bucket", "nyc_taxi/file1.parquet", etag))
+    sqs.send_message(QueueUrl=queue_url, MessageBody=_object_created_event("test-bucket", "other/file2.parquet", etag))
+
+    processor = S3FileProcessor()
+    queued = processor.get_queued_files("test-bucket", "nyc_taxi/", queue_url)
+
+    assert queued["unprocessed_files"] == ["nyc_taxi/file1.parquet"]
+    assert len(queued["receipt_handles"]) == 4
+
+
+@mock_aws
+def test_get_queued_files_skips_processed_etag(aws_credentials):
+    s3 = boto3.client("s3")
+    sqs = boto3.client("sqs")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    queue_url = sqs.create_queue(QueueName="test-queue")["QueueUrl"]
+
+    etag = s3.put_object(Bucket="test-bucket", Key="nyc_taxi/file1.parquet", Body=b"data")["ETag"].strip('"')
+    processor = S3FileProcessor()
+    processor.mark_as_processed("test-bucket", "nyc_taxi/file1.parquet")
+    sqs.send_message(QueueUrl=queue_url, MessageBody=_object_created_event("test-bucket", "nyc_taxi/file1.parquet", etag))
+
+    queued = processor.get_queued_files("test-bucket", "nyc_taxi/", queue_url)
+    assert queued["unprocessed_files"] == []
+
+    # Overwriting the key yields a new ETag, so the object is picked up again
+    new_etag = s3.put_object(Bucket="test-bucket", Key="nyc_taxi/file1.parquet", Body=b"corrected")["ETag"].strip('"')
+    sqs.send_message(QueueUrl=queue_url, MessageBody=_object_created_event("test-bucket", "nyc_taxi/file1.parquet", new_etag))
+
+    queued = processor.get_queued_files("test-bucket", "nyc_taxi/", queue_url)
+    assert queued["unprocessed_files"] == ["nyc_taxi/file1.parquet"]
+
+
+@mock_aws
+def test_acknowledge_queued(aws_credentials):
+    s3 = boto3.client("s3")
+    sqs = boto3.client("sqs")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "us-east-2"})
+    queue_url = sqs.create_queue(QueueName="test-queue")["QueueUrl"]
+    for i in range(12):
+        sqs.send_message(QueueUrl=queue_url, MessageBody=_object_created_event("test-bucket", f"nyc_taxi/file{i}.parquet", "etag"))
+
+    processor = S3FileProcessor()
+    queued = processor.get_queued_files("test-bucket", "nyc_taxi/", queue_url, max_messages=12)
+    processor.acknowledge_queued(queue_url, queued["receipt_handles"])
+
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["All"])["Attributes"]
+    assert attributes["ApproximateNumberOfMessages"] == "0"
+    assert attributes["ApproximateNumberOfMessagesNotVisible"] == "0"
+
+
+@mock_aws
+def test_acknowledge_queued_reports_failed_deletes(aws_credentials):
+    processor = S3FileProcessor()
+    processor.sqs = MagicMock()
+    processor.sqs.delete_message_batch.return_value = {
+        "Successful": [{"Id": "0"}],
+        "Failed": [{"Id": "1", "Code": "ReceiptHandleIsInvalid", "Message": "stale", "SenderFault": True}],
+    }
+
+    with pytest.raises(Exception, match="Failed to delete 1 of 2 messages"):
+        processor.acknowledge_queued("queue-url", ["handle-0", "handle-1"])
+
+    with patch("src.lambda_functions.s3_operations.S3FileProcessor", return_value=processor):
+        response = lambda_handler({"action": "ack_queued", "bucket": "test-bucket", "queue_url": "queue-url", "receipt_handles": ["h"]}, None)
+    assert response["statusCode"] == 500
+    assert "ReceiptHandleIsInvalid" in response["body"]
+
+
+def test_parse_s3_event_message_notification_records():
+    body = json.dumps({"Records": [{"s3": {"bucket": {"name": "test-bucket"}, "object": {"key": "nyc_taxi/yellow+taxi.parquet", "eTag": "abc"}}}]})
+
+    assert parse_s3_event_message(body) == [{"bucket": "test-bucket", "key": "nyc_taxi/yellow taxi.parquet", "etag": "abc"}]
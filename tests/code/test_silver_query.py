@@ -0,0 +1,118 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.query.silver_query import (
+    FooterCache,
+    SilverQuery,
+    matches_filter,
+    parse_partition_value,
+    stats_may_match,
+)
+
+
+@pytest.fixture
+def silver_root(tmp_path):
+    """Write a small silver layout partitioned by payment_type"""
+    for payment_type in (1, 2):
+        partition = tmp_path / f"payment_type={payment_type}"
+        partition.mkdir()
+        table = pa.table(
+            {
+                "PULocationID": pa.array(range(100), pa.int64()),
+                "fare_amount": pa.array([float(i) for i in range(100)]),
+                "tpep_pickup_datetime": pa.array([datetime(2024, 1, 1 + i // 10) for i in range(100)], pa.timestamp("us")),
+            }
+        )
+        pq.write_table(table, partition / "part-0.parquet", row_group_size=10)
+    (tmp_path / "_SUCCESS").write_text("")
+    return str(tmp_path)
+
+
+def test_parse_partition_value():
+    assert parse_partition_value("1") == 1
+    assert parse_partition_value("1.5") == 1.5
+    assert parse_partition_value("2024-01") == "2024-01"
+    assert parse_partition_value("007") == "007"
+    assert parse_partition_value("rg0012e400") == "rg0012e400"
+    assert parse_partition_value("__HIVE_DEFAULT_PARTITION__") is None
+
+
+def test_matches_filter():
+    assert matches_filter(1, "=", 1)
+    assert not matches_filter(1, ">", 1)
+    assert matches_filter(2, "in", [1, 2])
+    assert not matches_filter(None, "=", 1)
+
+
+def test_stats_may_match():
+    assert stats_may_match(10, 19, "=", 15)
+    assert not stats_may_match(10, 19, "=", 25)
+    assert not stats_may_match(10, 19, "<", 10)
+    assert stats_may_match(10, 19, ">=", 19)
+    assert not stats_may_match(10, 19, "in", [1, 30])
+    assert not stats_may_match(5, 5, "!=", 5)
+
+
+def test_to_table_prunes_partitions_and_row_groups(silver_root):
+    query = SilverQuery(silver_root)
+
+    table = query.to_table(columns=["PULocationID", "fare_amount"], filters=[("payment_type", "=", 1), ("PULocationID", "=", 42)])
+
+    assert table.column_names == ["PULocationID", "fare_amount"]
+    assert table.num_rows == 1
+    assert table["fare_amount"][0].as_py() == 42.0
+    assert query.last_scan.partitions_pruned == 1
+    assert query.last_scan.files_scanned == 1
+    assert query.last_scan.row_groups_total == 10
+    assert query.last_scan.row_groups_read == 1
+
+
+def test_to_table_adds_partition_columns(silver_root):
+    query = SilverQuery(silver_root)
+
+    table = query.to_table(filters=[("tpep_pickup_datetime", ">=", datetime(2024, 1, 10))])
+
+    assert table.num_rows == 20
+    assert set(table["payment_type"].to_pylist()) == {1, 2}
+    assert query.last_scan.row_groups_read == 2
+
+
+def test_to_batches_streams_matching_rows(silver_root):
+    query = SilverQuery(silver_root)
+
+    batches = list(query.to_batches(columns=["PULocationID"], filters=[("PULocationID", "in", [5, 55])], batch_size=5))
+
+    assert sum(batch.num_rows for batch in batches) == 4
+    assert all(batch.schema.names == ["PULocationID"] for batch in batches)
+
+
+def test_footer_cache_reuses_and_evicts(silver_root):
+    cache = FooterCache(max_entries=1)
+    query = SilverQuery(silver_root, footer_cache=cache)
+
+    query.to_table(filters=[("payment_type", "=", 1)])
+    query.to_table(filters=[("payment_type", "=", 1)])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    query.to_table()
+    assert len(cache.entries) == 1
+
+
+def test_to_table_casts_literals_to_decimal_columns(tmp_path):
+    partition = tmp_path / "payment_type=1"
+    partition.mkdir()
+    fares = [Decimal(f"{i}.25") for i in range(100)]
+    table = pa.table({"PULocationID": pa.array(range(100), pa.int16()), "fare_amount": pa.array(fares, pa.decimal128(10, 2))})
+    pq.write_table(table, partition / "part-0.parquet", row_group_size=10)
+    query = SilverQuery(str(tmp_path))
+
+    assert query.to_table(filters=[("fare_amount", ">", 95)]).num_rows == 5
+    assert query.last_scan.row_groups_read == 1
+    assert query.to_table(filters=[("fare_amount", ">=", 95.25)]).num_rows == 5
+    assert query.to_table(filters=[("fare_amount", "<", 0.255)]).num_rows == 1
+    assert query.to_table(filters=[("fare_amount", "in", [1.25, 2])]).num_rows == 1
+    assert query.to_table(filters=[("PULocationID", "<", 1000)]).num_rows == 100